@@ -1,23 +1,20 @@
 import os
+import copy
 import json
 import logging
 import datetime
-from guspy.parsers import ShiftParser
+from guspy.parsers import ShiftParser, shift_windows
 from guspy.filters import *
-import sys
-try:
-    objects = os.path.abspath(os.path.join(sys.prefix, 'resources', 'objects.json'))
-    with open(objects, 'r') as infile:
-        obj = json.load(infile)
-except:
-    try:
-        objects = os.path.abspath(os.path.join(sys.prefix, 'local', 'resources', 'objects.json'))
-        with open(objects, 'r') as infile:
-            obj = json.load(infile)
-    except:
-        obj = os.path.abspath(os.path.join(sys.prefix, os.path.pardir, 'resources', 'objects.json'))
-        with open(obj, 'r') as infile:
-            obj = json.load(infile)
+from guspy.resources import objects
+from guspy.schema import schema
+from guspy.soql import GUS_BATCH_CHARS, GUS_BATCH_ITEMS, chunk, listify, Raw, Eq, In, And, Or, Compare, Select
+
+
+def __getattr__(name):
+    # objects.json is only read the first time it is needed, `guspy.obj` is kept for existing callers
+    if name == "obj":
+        return objects()
+    raise AttributeError(f"module 'guspy' has no attribute '{name}'")
 
 # TODO deprecate this in v2.0
 # def quote(string):
@@ -27,39 +24,47 @@ except:
 # def bracket(string):
 #     return "(" + string + ")"
 
-
 class Query:
     def __init__(self, obj_name):
-        if obj_name in obj:
-            self.obj = obj[obj_name]["Object"]
+        self.name = obj_name
+        if obj_name in schema():
+            self.obj = schema().object(obj_name)
         else:
             logging.warning(f"[Query] Warning: {obj_name} is not found in our compilation. ")
             self.obj = obj_name
 
+    def select(self, fields, filters=None, sort_by=None, sort_seq=None, limit=None):
+        if isinstance(filters, str):
+            filters = Raw(filters)
+        return Select(fields, self.obj, where=filters, order_by=sort_by, order=sort_seq, limit=limit)
+
     def create(self, fields, filters=None, sort_by=None, sort_seq=None, limit=None):
         try:
-            query = f"SELECT {fields} FROM {self.obj}"
-            if filters:
-                query += f" WHERE {filters}"
-            if sort_by and sort_seq:
-                query += f" ORDER BY {sort_by} {sort_seq}"
-            if limit:
-                query += f" LIMIT {limit}"
-            return query
+            return self.select(fields, filters, sort_by, sort_seq, limit).render()
         except Exception as e:
             print(f"[Query Creation] Unable to create query: {e}")
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class GUSObject:
-    def __init__(self, fields=None, filters=None, limit=None, sort_by=None, sort_seq=None):
+    def __init__(self, fields=None, filters=None, limit=None, sort_by=None, sort_seq=None, gus=None):
+        # With a Gus connection, case numbers are resolved to Ids through its cache instead of a sub-select
+        self.gus = gus
         self.field_value = "Id"
-        self.filter_value = None
+        self.where = None
         self.fields(fields)
         self.filters(filters)
         self.limit(limit)
         self.sort(sort_by, sort_seq)
 
+    @property
+    def filter_value(self):
+        return self.where.render() if self.where is not None else None
+
+    @filter_value.setter
+    def filter_value(self, filters):
+        self.where = Raw(filters) if isinstance(filters, str) else filters
+
     def fields(self, fields):
         if fields:
             if type(fields) == str:
@@ -72,11 +77,36 @@ class GUSObject:
             logging.info(f"[GUSObject] No fields given, using default: {self.field_value}")
 
     def filters(self, filters, append=None):
-        if self.filter_value:
-            if append:
-                self.filter_value += f" {append} {filters}"
+        # filters may be a string (e.g. from guspy.filters) or a guspy.soql node
+        if isinstance(filters, str):
+            filters = Raw(filters)
+        if self.where is not None:
+            if append and filters is not None:
+                self.where = And(self.where, filters) if append.upper() == "AND" else Or(self.where, filters)
         else:
-            self.filter_value = filters
+            self.where = filters
+
+    def match(self, field, value):
+        # Equality for a single value, IN (...) for a list or a comma separated string of values
+        items = listify(value)
+        self.filters(Eq(field, items[0]) if len(items) == 1 else In(field, items), append="AND")
+
+    def match_cases(self, field, case_number):
+        # Semi-join on the Ids of the given case numbers, or their literal Ids when a Gus connection is known
+        if self.gus:
+            ids = list(self.gus.cases.prefetch(case_number).values())
+            if ids:
+                self.match(field, ids)
+                return
+        self.filters(In(field, Case().select(case_number=case_number)), append="AND")
+
+    def __deepcopy__(self, memo):
+        # The Gus connection is shared by copies (e.g. in batch), everything else is copied
+        clone = copy.copy(self)
+        for key, value in self.__dict__.items():
+            if key != 'gus':
+                setattr(clone, key, copy.deepcopy(value, memo))
+        return clone
 
     def limit(self, num=15):
         self.limit_value = num
@@ -88,211 +118,169 @@ class GUSObject:
     def query_object(self, object_name):
         self.query_obj = Query(object_name)
 
-    def generate(self):
-        self.query = self.query_obj.create(
-            fields=self.field_value,
-            filters=self.filter_value,
+    def batch(self, max_chars=GUS_BATCH_CHARS, max_items=GUS_BATCH_ITEMS, **kwargs):
+        # Yields one query per SOQL-safe chunk of the longest IN list built by create, e.g.
+        # Case(fields="Id").batch(case_number=[...])
+        for select in copy.deepcopy(self).select(**kwargs).split(max_chars=max_chars, max_items=max_items):
+            yield select.render()
+
+    def build(self, *args, **kwargs):
+        # Subclasses pick their object and add the filters for their create arguments here
+        pass
+
+    def select(self, *args, **kwargs):
+        # Same as create, but returns the guspy.soql.Select tree instead of the rendered SOQL
+        self.build(*args, **kwargs)
+        return self.tree()
+
+    def create(self, *args, **kwargs):
+        self.build(*args, **kwargs)
+        return self.generate()
+
+    def tree(self):
+        return self.query_obj.select(
+            fields=schema().translate(self.query_obj.name, self.field_value),
+            filters=self.where,
             sort_by=self.sort_by,
             sort_seq=self.sort_seq,
             limit=self.limit_value
         )
+
+    def generate(self):
+        self.query = self.tree().render()
         return self.query
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class Apprise(GUSObject):
-    def create(self, case_number=None):
+    def build(self, case_number=None):
         self.query_object("AppriseLogs")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                get_case_id = Case(filters=is_in("CaseNumber", bracket(case_number))).create()
-            else:
-                get_case_id = Case(filters=equals("CaseNumber", case_number)).create()
-            self.filters(is_in("Case__c", bracket(get_case_id)), append="AND")
-        return self.generate()
+            self.match_cases("Case__c", case_number)
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class Attachment(GUSObject):
-    def create(self, case_number=None):
+    def build(self, case_number=None):
         self.query_object("Attachment")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                get_case_id = Case(filters=is_in("CaseNumber", bracket(case_number))).create()
-            else:
-                get_case_id = Case(filters=equals("CaseNumber", case_number)).create()
-            self.filters(is_in("ParentId", bracket(get_case_id)), append="AND")
-        return self.generate()
+            self.match_cases("ParentId", case_number)
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class Case(GUSObject):
-    def create(self, case_number=None):
+    def build(self, case_number=None):
         self.query_object("Case")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                self.filters(is_in("CaseNumber", bracket(case_number)), append="AND")
-            else:
-                self.filters(equals("CaseNumber", case_number), append="AND")
-        return self.generate()
+            self.match("CaseNumber", case_number)
 
 
 # Query the CaseComment based on CommentId, CaseId, or simply the CommentIds that are related to GRE
 class CaseComment(GUSObject):
-    def create(self, case_number=None):
+    def build(self, case_number=None):
         self.query_object("CaseComment")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                get_case_id = Case(filters=is_in("CaseNumber", bracket(case_number))).create()
-            else:
-                get_case_id = Case(filters=equals("CaseNumber", case_number)).create()
-            self.filters(is_in("ParentId", bracket(get_case_id)), append="AND")
-        return self.generate()
+            self.match_cases("ParentId", case_number)
 
 
 # Query the CaseComment based on CommentId, CaseId, or simply the CommentIds that are related to GRE
 class Chatter(GUSObject):
-    def create(self, case_id=None):
+    def build(self, case_id=None):
         self.query_object("Chatter")
         if case_id:
-            if type(case_id) == list:
-                case_id = ",".join([f"'{number}'" for number in case_id])
-            if "," in case_id:
-                self.filters(is_in("ParentId", bracket(case_id)), append="AND")
-            else:
-                self.filters(equals("ParentId", case_id), append="AND")
-        return self.generate()
+            self.match("ParentId", case_id)
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class CIStep(GUSObject):
-    def create(self, case_number=None):
+    def build(self, case_number=None):
         self.query_object("CIStep")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                get_case_id = Case(filters=is_in("CaseNumber", bracket(case_number))).create()
-            else:
-                get_case_id = Case(filters=equals("CaseNumber", case_number)).create()
-            self.filters(is_in("Case__c", bracket(get_case_id)), append="AND")
-        return self.generate()
+            self.match_cases("Case__c", case_number)
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class ClusterInstanceLink(GUSObject):
-    def create(self, instances=None):
+    def build(self, instances=None):
         self.query_object("ClusterInstanceLink")
         if instances:
-            if type(instances) == list:
-                instances = ",".join([f"'{inst}'" for inst in instances])
-            if "," in instances:
-                self.filters(is_in(obj['ClusterInstanceLink']['Instance'], bracket(instances)), append="AND")
-            else:
-                self.filters(equals(obj['ClusterInstanceLink']['Instance'], instances), append="AND")
-        return self.generate()
+            self.match(schema().field("ClusterInstanceLink", "Instance"), instances)
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class CTCLock(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("CTCLock")
-        return self.generate()
 
 
 # Query ScrumTeamMember attributes based on Team Name, or simply the Member Names in GRE
 class ScrumMember(GUSObject):
-    def create(self, team_name=None):
+    def build(self, team_name=None):
         self.query_object("ScrumMember")
         if team_name:
-            if type(team_name) == list:
-                team_name = ",".join([f"'{number}'" for number in team_name])
-            if "," in team_name:
-                self.filters(is_in(obj['ScrumMember']['TeamName'], bracket(team_name)), append="AND")
-            else:
-                self.filters(equals(obj['ScrumMember']['TeamName'], team_name), append="AND")
-        return self.generate()
+            self.match(schema().field("ScrumMember", "TeamName"), team_name)
 
 
 # Query the attributes of the User based on their individual UserIds
 class User(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("User")
-        return self.generate()
 
 
 # Query the CaseId by the Case Number provided (single or a list), or simply CaseIds that are related to GRE
 class Release(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("Release")
-        return self.generate()
 
 
 class ReleaseEvent(GUSObject):
-    def create(self, case_number=None, case_id=None):
+    def build(self, case_number=None, case_id=None, date=None, end_date=None, shift="ALL"):
         self.query_object("ReleaseEvent")
         if case_number:
-            if type(case_number) == list:
-                case_number = ",".join([f"'{number}'" for number in case_number])
-            if "," in case_number:
-                get_case_id = Case(filters=is_in("CaseNumber", bracket(case_number))).create()
-            else:
-                get_case_id = Case(filters=equals("CaseNumber", case_number)).create()
-            self.filters(is_in("ChangeCase__c", bracket(get_case_id)), append="AND")
+            self.match_cases("ChangeCase__c", case_number)
         elif case_id:
-            if type(case_id) == list:
-                case_id = ",".join([f"'{number}'" for number in case_id])
-            if "," in case_id:
-                self.filters(is_in("ChangeCase__c", bracket(case_id)), append="AND")
-            else:
-                self.filters(equals("ChangeCase__c", case_id), append="AND")
-        return self.generate()
+            self.match("ChangeCase__c", case_id)
+        if date:
+            self.during(date, end_date, shift)
+
+    def during(self, date, end_date=None, shift="ALL"):
+        # Events overlapping the given shift(s) on each day from date to end_date, as one OR of merged windows
+        start_field = schema().field("ReleaseEvent", "Start")
+        end_field = schema().field("ReleaseEvent", "End")
+        windows = [And(Compare(start_field, "<", end.strftime("%Y-%m-%dT%H:%M:%SZ")),
+                       Compare(end_field, ">", start.strftime("%Y-%m-%dT%H:%M:%SZ")))
+                   for start, end in shift_windows(date, end_date, shift)]
+        if not windows:
+            raise ValueError(f"[ReleaseEvent] No {shift} shift between {date} and {end_date or date}")
+        self.filters(windows[0] if len(windows) == 1 else Or(*windows), append="AND")
 
 
 # Activity History within the Change Case (important for GL status)
 class Task(GUSObject):
-    def create(self, case_id=None):
+    def build(self, case_id=None):
         self.query_object("Task")
         if case_id:
-            if type(case_id) == list:
-                case_id = ",".join([f"'{number}'" for number in case_id])
-            if "," in case_id:
-                self.filters(is_in("WhatId", bracket(case_id)), append="AND")
-            else:
-                self.filters(equals("WhatId", case_id), append="AND")
-        return self.generate()
+            self.match("WhatId", case_id)
 
 
 class InstanceDatacenter(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("InstanceDatacenter")
-        return self.generate()
 
 
 class LogicalHost(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("LogicalHost")
-        return self.generate()
 
 
 class RecordType(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("RecordType")
-        return self.generate()
 
 
 class WorkItem(GUSObject):
-    def create(self):
+    def build(self):
         self.query_object("WorkItem")
-        return self.generate()
 
 
 # TODO deprecate this in v2.0
@@ -1,39 +1,176 @@
-from simple_salesforce import Salesforce, SalesforceLogin
-from simple_salesforce.exceptions import SalesforceAuthenticationFailed, SalesforceExpiredSession
-import pandas as pd
+import io
+import os
+import csv
+import json
+import time
+import asyncio
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from guspy.optimizer import CaseResolver
+from guspy.soql import Node
+
+# requests, simple_salesforce and pandas are imported where they are first used, so importing
+# guspy.access (or the AsyncGus it defines) stays cheap for short-lived scripts
 
 GUS_BASE_URL = "https://gus.my.salesforce.com"
 GUS_CHATTER_FEED_URL = f"{GUS_BASE_URL}/services/data/v40.0/chatter/feed-elements"
+GUS_CHATTER_BATCH_URL = f"{GUS_CHATTER_FEED_URL}/batch"
+GUS_COMPOSITE_URL = f"{GUS_BASE_URL}/services/data/v52.0/composite/sobjects"
+GUS_BULK_QUERY_URL = f"{GUS_BASE_URL}/services/data/v52.0/jobs/query"
+GUS_BULK_INGEST_URL = f"{GUS_BASE_URL}/services/data/v52.0/jobs/ingest"
+GUS_BULK_PAGE_SIZE = 100000
+GUS_BULK_POLL = 2
+GUS_BULK_POLL_MAX = 30
+GUS_COMPOSITE_BATCH = 200           # records per sObject Collections request
+GUS_CHATTER_BATCH = 500             # feed elements per Chatter batch request
+GUS_BULK_WRITE_THRESHOLD = 2000     # larger updates go through a Bulk API ingest job
+GUS_SESSION_REFRESH = 100 * 60      # sessions time out after 2 hours without activity (org default)
+GUS_LOGIN_COOLDOWN = 60
+GUS_POOL_SIZE = 10
+GUS_DOWNLOAD_WORKERS = 8
+GUS_CHUNK_SIZE = 64 * 1024
+GUS_PARENT_COLUMN = "parent_index"
+
+
+def pooled_session(pool_size=GUS_POOL_SIZE, limiter=None):
+    # Keep-alive session whose adapters hold up to pool_size connections per host, sending every
+    # request through limiter when one is given
+    import requests
+    from requests.adapters import HTTPAdapter
+    from guspy.limits import LimitedAdapter
+    session = requests.Session()
+    if limiter is not None:
+        adapter = LimitedAdapter(limiter, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def flatten(record, row=None, prefix="", children=None):
+    # Copies a record into row with nested relationship records as dotted keys ("CreatedBy.Name") and their
+    # 'attributes' dropped. Child subquery results ({'records': [...], ...}) are added to children by
+    # relationship name, or skipped when children is None
+    if row is None:
+        row = dict()
+    for key, value in record.items():
+        if key == 'attributes':
+            continue
+        name = prefix + key
+        if isinstance(value, dict):
+            if 'records' in value:
+                if children is not None:
+                    children[name] = value
+                continue
+            flatten(value, row, name + ".", children)
+        else:
+            row[name] = value
+    return row
+
+
+def accumulate(records, columns=None, size=0, flat=False, children=None):
+    # Appends each record into per-column buffers, dropping the 'attributes' key as it goes
+    # Columns first seen part-way through are back-filled with None so every buffer stays aligned
+    # With flat, relationships become dotted columns and child subquery results are collected into
+    # children as {relationship: [(parent row, result), ...]}
+    if columns is None:
+        columns = dict()
+    for record in records:
+        if flat:
+            related = dict() if children is not None else None
+            record = flatten(record, children=related)
+            for name, result in (related or {}).items():
+                children.setdefault(name, []).append((size, result))
+        for key, value in record.items():
+            if key == 'attributes':
+                continue
+            if key not in columns:
+                columns[key] = [None] * size
+            columns[key].append(value)
+        size += 1
+        for buffer in columns.values():
+            if len(buffer) < size:
+                buffer.append(None)
+    if flat:
+        # An empty relationship comes back as None; drop that column when its dotted columns exist
+        for key in [key for key in columns if any(column.startswith(key + ".") for column in columns)]:
+            if all(value is None for value in columns[key]):
+                del columns[key]
+    return columns, size
+
+
+def stringify(columns):
+    # Accumulated REST columns as the Bulk API CSV gives them: strings, booleans in lower case and nulls as NaN
+    import pandas as pd
+
+    def text(value):
+        if value is None:
+            return None
+        return str(value).lower() if isinstance(value, bool) else str(value)
+    return pd.DataFrame({key: [text(value) for value in values] for key, values in columns.items()}, dtype=str)
 
 
 class Gus:
-    def __init__(self, username, password, otp=None):
+    def __init__(self, username, password, otp=None, pool_size=GUS_POOL_SIZE, cache=None, case_ids=None,
+                 bulk_threshold=None, limiter=None, retries=None):
+        from guspy.limits import RateLimiter, GUS_RETRIES
         self.username = username
         self.password = password
         self.otp = otp
+        self.cache = cache
+        self.bulk_threshold = bulk_threshold
+        self.limiter = limiter if limiter is not None else RateLimiter(concurrency=pool_size)
+        self.retries = retries if retries is not None else GUS_RETRIES
+        self.session = pooled_session(pool_size, self.limiter)
         self.session_id, self.instance = None, None
+        self.soql = None
+        self.lock = threading.Lock()
+        self.generation = 0                 # bumped on every successful refresh
+        self.last_used = time.monotonic()
+        self.session_refresh = GUS_SESSION_REFRESH
+        self.failed_login = None
+        self.cases = CaseResolver(self, backend=case_ids)
         self.soql = self.connect()
 
     def get_instance(self, otp=None):
+        # Returns (None, None) when the login fails, leaving the stored session as it was
+        from simple_salesforce import SalesforceLogin
         if otp:
             self.otp = otp
         try:
             if self.otp:
-                self.session_id, self.instance = SalesforceLogin(username=self.username,
-                                                                 password=self.password + "." + self.otp)
+                session_id, instance = SalesforceLogin(username=self.username,
+                                                       password=self.password + "." + self.otp,
+                                                       session=self.session)
             else:
-                self.session_id, self.instance = SalesforceLogin(username=self.username,
-                                                                 password=self.password)
+                session_id, instance = SalesforceLogin(username=self.username,
+                                                       password=self.password,
+                                                       session=self.session)
         except Exception as e:
             print(e)                                # TODO ERROR LOGGING IN
+            return None, None
+        self.session_id, self.instance = session_id, instance
         return self.session_id, self.instance
 
+    def client(self, session_id, instance):
+        # Reuses the existing client (and its pooled session) when only the session id has changed
+        if self.soql is not None and self.soql.sf_instance == instance:
+            self.soql.session_id = session_id
+            self.soql.headers['Authorization'] = "Bearer " + session_id
+            return self.soql
+        from simple_salesforce import Salesforce
+        return Salesforce(session_id=session_id,
+                          instance=instance,
+                          session=self.session)
+
     def connect(self):
         session_id, instance = self.get_instance(otp=self.otp)
         if instance:
-            return Salesforce(session_id=session_id,
-                              instance=instance)
-        elif SalesforceAuthenticationFailed:
+            return self.client(session_id, instance)
+        else:
             print("Authentication Failed, please check guspy")
             # TODO ERROR CONNECTING INSTANCE
             return None
@@ -45,23 +182,126 @@ class Gus:
         else:
             session_id, instance = self.get_instance()
         if instance:
-            return Salesforce(session_id=session_id,
-                              instance=instance)
-        elif SalesforceAuthenticationFailed:
+            return self.client(session_id, instance)
+        else:
             print("Authentication Failed, please check guspy")
             # TODO ERROR CONNECTING INSTANCE
             return None
 
-    def raw(self, query):
-        try:
-            data = self.soql.query_all(query)['records']
-        except SalesforceExpiredSession as error:
-            self.soql = self.reconnect()
-            data = self.soql.query_all(query)['records']
+    def refresh(self, generation, otp=None, idle=None):
+        # Single-flight login: the first caller still on the given session generation logs in again while the
+        # others wait on the lock, then reuse its session. With idle, that only happens if the session has
+        # been idle for longer. After a failed login the callers that waited on it fail too, and no one tries
+        # again from that generation for GUS_LOGIN_COOLDOWN seconds, so an expiry cannot turn into a login storm
+        with self.lock:
+            if self.generation != generation:
+                return self.soql
+            if idle is not None and time.monotonic() - self.last_used <= idle:
+                return self.soql
+            if self.failed_login and self.failed_login[0] == generation and \
+                    time.monotonic() - self.failed_login[1] < GUS_LOGIN_COOLDOWN:
+                raise Exception("[GUSPY] Session expired and logging in again just failed, please check guspy")
+            soql = self.reconnect(otp)
+            if soql is None:
+                self.failed_login = (generation, time.monotonic())
+                raise Exception("[GUSPY] Session expired and logging in again failed, please check guspy")
+            self.soql = soql
+            self.generation += 1
+            self.failed_login = None
+            self.last_used = time.monotonic()
+        return self.soql
+
+    def call(self, func, idempotent=True):
+        # Runs func(), logging in again and retrying once if the session has expired, and retrying transient
+        # errors (throttling, dropped connections, row locks) up to self.retries times with exponential backoff.
+        # Writes that must not be repeated (idempotent=False) are only retried when Salesforce refused them
+        # func must read self.soql / self.session_id when called so a retry picks up the new session.
+        # A session idle for longer than self.session_refresh is renewed first instead of waiting for it to fail
+        from simple_salesforce.exceptions import SalesforceExpiredSession
+        from guspy.limits import transient, refused, backoff
+        generation = self.generation
+        if time.monotonic() - self.last_used > self.session_refresh:
+            try:
+                self.refresh(generation, idle=self.session_refresh)
+            except Exception as e:
+                logging.warning(f"{e}, carrying on with the current session")
+            generation = self.generation
+        expired, attempt = False, 0
+        while True:
+            try:
+                result = func()
+                self.last_used = time.monotonic()
+                return result
+            except SalesforceExpiredSession:
+                if expired:
+                    raise
+                expired = True
+                self.refresh(generation)
+                generation = self.generation
+            except Exception as e:
+                if attempt >= self.retries or not (transient(e) if idempotent else refused(e)):
+                    raise
+                delay = backoff(attempt)
+                attempt += 1
+                logging.warning(f"[GUSPY] {e.__class__.__name__}, retrying in {delay:.1f}s "
+                                f"({attempt}/{self.retries})")
+                time.sleep(delay)
+
+    def raw(self, query, cache=True, page=None):
+        # page is a first page of the query that was already fetched, the rest is read from its nextRecordsUrl
+        if self.cache and cache:
+            data = self.cache.get(query)
+            if data is not None:
+                return data
+        if page is not None:
+            data = [record for records in self.iter_pages(query, page) for record in records]
+        else:
+            data = self.call(lambda: self.soql.query_all(query)['records'])
+        if self.cache and cache:
+            self.cache.set(query, data)
         return data
 
-    def parse(self, query):
-        data = self.raw(query)
+    def iter_pages(self, query, page=None):
+        # Follows nextRecordsUrl one page at a time, so only a single page of records is held in memory
+        if page is None:
+            page = self.call(lambda: self.soql.query(query))
+        while True:
+            yield page['records']
+            if page.get('done', True) or not page.get('nextRecordsUrl'):
+                break
+            next_url = page['nextRecordsUrl']
+            page = self.call(lambda: self.soql.query_more(next_url, identifier_is_url=True))
+
+    def iter_records(self, query):
+        for records in self.iter_pages(query):
+            for record in records:
+                yield record
+
+    def parse(self, query, columnar=False, cache=True, flatten=False, bulk=None):
+        # flatten turns relationship fields into dotted columns (leaving out child subqueries, see parse_related)
+        # bulk runs the query as a Bulk API job; left as None, that happens when the query is not cached
+        # and matches more than bulk_threshold rows. The first REST page tells, and is kept when it is below.
+        # Either way a query left to bulk_threshold comes back in the Bulk API shape: flattened, all strings
+        import pandas as pd
+        first = None
+        auto = bulk is None and self.bulk_threshold is not None
+        if auto:
+            if not (self.cache and cache and query in self.cache):
+                first = self.call(lambda: self.soql.query(query))
+                bulk = first['totalSize'] > self.bulk_threshold
+            flatten = True
+        if bulk:
+            frames = list(self.iter_bulk(query))
+            if not frames:
+                return pd.DataFrame()
+            return pd.concat(frames, ignore_index=True)
+        if columnar or flatten:
+            columns, size = dict(), 0
+            pages = [self.raw(query, page=first)] if self.cache and cache else self.iter_pages(query, first)
+            for records in pages:
+                columns, size = accumulate(records, columns, size, flat=flatten)
+            return stringify(columns) if auto else pd.DataFrame(columns)
+        data = self.raw(query, cache=cache, page=first)
         data = pd.DataFrame(data)
         if data.empty:
             pass
@@ -69,43 +309,468 @@ class Gus:
             data = data.drop('attributes', axis=1)
         return data
 
+    def parse_related(self, query, cache=True):
+        # Returns the flattened DataFrame and {relationship: DataFrame} for each child subquery, e.g.
+        # "SELECT Id, (SELECT Id FROM CaseComments) FROM Case". Every child row holds the row of its parent
+        # record in GUS_PARENT_COLUMN, and child results larger than one page are followed to the end
+        import pandas as pd
+        columns, size, children = dict(), 0, dict()
+        pages = [self.raw(query)] if self.cache and cache else self.iter_pages(query)
+        for records in pages:
+            columns, size = accumulate(records, columns, size, flat=True, children=children)
+        related = dict()
+        for name, results in children.items():
+            rows = ({GUS_PARENT_COLUMN: index, **record}
+                    for index, result in results for record in self.iter_related(result))
+            related[name] = pd.DataFrame(accumulate(rows, flat=True)[0])
+        return pd.DataFrame(columns), related
+
+    def iter_related(self, result):
+        # Records of one child subquery result, following its nextRecordsUrl when there are more
+        while True:
+            yield from result['records']
+            if result.get('done', True) or not result.get('nextRecordsUrl'):
+                break
+            next_url = result['nextRecordsUrl']
+            result = self.call(lambda: self.soql.query_more(next_url, identifier_is_url=True))
+
+    def iter_frames(self, query, flatten=False):
+        import pandas as pd
+        for records in self.iter_pages(query):
+            columns, size = accumulate(records, flat=flatten)
+            yield pd.DataFrame(columns)
+
+    def bulk_job(self, query):
+        # Submits the query as a Bulk API 2.0 job, returning its id
+        body = json.dumps({"operation": "query", "query": query})
+        response = self.call(lambda: self.soql._call_salesforce("POST", url=GUS_BULK_QUERY_URL, data=body),
+                             idempotent=False)
+        return response.json()['id']
+
+    def wait_job(self, job_id, poll=None, timeout=None, jobs=None):
+        # Polls the query (or, with jobs=GUS_BULK_INGEST_URL, ingest) job, backing off up to
+        # GUS_BULK_POLL_MAX seconds, until its results are ready
+        url = f"{jobs or GUS_BULK_QUERY_URL}/{job_id}"
+        poll = GUS_BULK_POLL if poll is None else poll
+        started = time.time()
+        while True:
+            job = self.call(lambda: self.soql._call_salesforce("GET", url=url)).json()
+            if job['state'] == "JobComplete":
+                return job
+            if job['state'] in ("Failed", "Aborted"):
+                raise Exception(f"[GUSPY] Bulk query {job_id} {job['state'].lower()}: {job.get('errorMessage')}")
+            if timeout is not None and time.time() - started > timeout:
+                self.call(lambda: self.soql._call_salesforce("PATCH", url=url, data=json.dumps({"state": "Aborted"})))
+                raise TimeoutError(f"[GUSPY] Bulk query {job_id} did not complete within {timeout} seconds")
+            time.sleep(poll)
+            poll = min(poll * 2, GUS_BULK_POLL_MAX)
+
+    def iter_results(self, job_id, page_size=GUS_BULK_PAGE_SIZE):
+        # Yields the streamed response of every CSV result page, following the Sforce-Locator header
+        url = f"{GUS_BULK_QUERY_URL}/{job_id}/results"
+        locator = None
+        while True:
+            params = {"maxRecords": page_size}
+            if locator:
+                params["locator"] = locator
+            response = self.call(lambda: self.soql._call_salesforce("GET", url=url, params=params, stream=True))
+            with response:
+                yield response
+            locator = response.headers.get('Sforce-Locator')
+            if not locator or locator == "null":
+                break
+
+    def iter_bulk(self, query, page_size=GUS_BULK_PAGE_SIZE, timeout=None):
+        # Runs the query through the Bulk API, yielding one DataFrame per result page. Values are kept as
+        # strings (the CSV has no types) and empty values become NaN
+        import pandas as pd
+        job_id = self.bulk_job(query)
+        self.wait_job(job_id, timeout=timeout)
+        for response in self.iter_results(job_id, page_size):
+            data = pd.read_csv(io.BytesIO(response.content), dtype=str, keep_default_na=False, na_values=[""])
+            if not data.empty:
+                yield data
+
+    def export(self, query, outfile, page_size=GUS_BULK_PAGE_SIZE, timeout=None, chunk_size=GUS_CHUNK_SIZE):
+        # Runs the query through the Bulk API, streaming the CSV result pages into the binary file object
+        # outfile under a single header row. Returns the number of records written
+        job_id = self.bulk_job(query)
+        self.wait_job(job_id, timeout=timeout)
+        records = 0
+        for page, response in enumerate(self.iter_results(job_id, page_size)):
+            records += int(response.headers.get('Sforce-NumberOfRecords', 0))
+            header = page > 0           # every page repeats the header row, only the first one is kept
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if header:
+                    if b"\n" not in chunk:
+                        continue
+                    chunk = chunk.split(b"\n", 1)[1]
+                    header = False
+                outfile.write(chunk)
+        return records
+
+    def optimize(self, query):
+        # Renders a GUSObject or soql.Select with its Case sub-selects replaced by literal Id lists
+        if not isinstance(query, Node) and not hasattr(query, 'query_obj'):
+            raise ValueError(f"[GUSPY] {type(query).__name__} has not been built yet, "
+                             f"optimize its select(...) or call create/select on it first")
+        return self.cases.flatten(query)[0].render()
+
+    def execute(self, queries, workers=GUS_POOL_SIZE, columnar=False, optimize=False):
+        # Runs several queries (SOQL strings or GUSObjects) concurrently through parse and returns
+        # {name: DataFrame}. A failed query maps to its exception instead, leaving the others untouched.
+        # With optimize, the Case sub-selects shared by the GUSObjects are resolved once up front
+        if isinstance(queries, dict):
+            named = list(queries.items())
+        else:
+            named = []
+            for index, query in enumerate(queries):
+                name = index if isinstance(query, str) else type(query).__name__
+                if name in dict(named):
+                    name = f"{name}_{index}"
+                named.append((name, query))
+        if optimize:
+            objects = [(name, query) for name, query in named if not isinstance(query, str)]
+            trees = self.cases.flatten(*[query if isinstance(query, Node) else
+                                         query.tree() if hasattr(query, 'query_obj') else query.select()
+                                         for name, query in objects])
+            rendered = {name: tree.render() for (name, query), tree in zip(objects, trees)}
+            named = [(name, rendered.get(name, query)) for name, query in named]
+
+        def run(query):
+            if isinstance(query, Node):
+                query = query.render()
+            elif not isinstance(query, str):
+                # Objects that were already built are rendered as they are, the rest are built without arguments
+                query = query.generate() if hasattr(query, 'query_obj') else query.create()
+            return self.parse(query, columnar=columnar)
+
+        results = dict()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(run, query) for name, query in named}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logging.error(f"[GUSPY] Query {name} failed: {e}")
+                    results[name] = e
+        return results
+
+    def parse_batches(self, queries, workers=1, columnar=False):
+        # Concatenates the results of several queries (e.g. from GUSObject.batch) into a single DataFrame
+        import pandas as pd
+        queries = list(queries)
+        if workers > 1:
+            results = self.execute(queries, workers=workers, columnar=columnar)
+            for result in results.values():
+                if isinstance(result, Exception):
+                    raise result
+            frames = list(results.values())
+        else:
+            frames = [self.parse(query, columnar=columnar) for query in queries]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_batches(self, queries):
+        for query in queries:
+            for record in self.iter_records(query):
+                yield record
+
     def update_work(self, id, body):
         if not id or not body:
-            raise "[GUSPY] Both work ID and body are required to update the work item"
+            raise ValueError("[GUSPY] Both work ID and body are required to update the work item")
         try:
-            self.soql.ADM_Work__c.update(id, body)
-        except SalesforceExpiredSession as error:
-            self.soql = self.reconnect()
-            self.soql.ADM_Work__c.update(id, body)
+            self.call(lambda: self.soql.ADM_Work__c.update(id, body))
         except Exception as e:
-            raise f"Seems like there was en error while updating the work: {e}"
+            raise Exception(f"Seems like there was en error while updating the work: {e}") from e
+
+    def update_works(self, updates, retries=1, workers=1):
+        # Updates many work items, taking {work Id: body} or a list of bodies that include their "Id".
+        # Up to GUS_BULK_WRITE_THRESHOLD records are sent as sObject Collections requests of
+        # GUS_COMPOSITE_BATCH records, larger updates as a Bulk API ingest job. Records that fail are
+        # retried on their own up to retries times. Returns {Id: True, or the exception for that record}
+        if isinstance(updates, dict):
+            records = [dict(body, Id=id) for id, body in updates.items()]
+        else:
+            records = [dict(record) for record in updates]
+        if not records or any(not record.get('Id') for record in records):
+            raise ValueError("[GUSPY] Every work item update needs the ID of the work item")
+        if len(records) <= GUS_BULK_WRITE_THRESHOLD:
+            return self.update_records("ADM_Work__c", records, retries=retries, workers=workers)
+        results = self.ingest("ADM_Work__c", "update", records)
+        failed = [record for record in records if results[record['Id']] is not True]
+        if failed and retries > 0:
+            results.update(self.update_records("ADM_Work__c", failed, retries=retries - 1, workers=workers))
+        return results
+
+    def update_records(self, obj, records, retries=1, workers=1):
+        # sObject Collections updates (allOrNone off) of records holding their "Id", retrying only the failures
+        def send(batch):
+            body = json.dumps({"allOrNone": False, "records": [
+                {"attributes": {"type": obj}, "id": record['Id'],
+                 **{key: value for key, value in record.items() if key != 'Id'}} for record in batch]})
+            return self.call(lambda: self.soql._call_salesforce("PATCH", url=GUS_COMPOSITE_URL, data=body)).json()
+
+        results, pending = dict(), list(records)
+        for attempt in range(retries + 1):
+            batches = [pending[index:index + GUS_COMPOSITE_BATCH]
+                       for index in range(0, len(pending), GUS_COMPOSITE_BATCH)]
+            pending = []
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [(batch, pool.submit(send, batch)) for batch in batches]
+                for batch, future in futures:
+                    try:
+                        outcomes = future.result()
+                    except Exception as e:
+                        outcomes = [{"success": False, "error": e}] * len(batch)
+                    for record, outcome in zip(batch, outcomes):
+                        if outcome.get('success'):
+                            results[record['Id']] = True
+                            continue
+                        errors = "; ".join(f"{error.get('statusCode')}: {error.get('message')}"
+                                           for error in outcome.get('errors', []))
+                        results[record['Id']] = outcome.get('error') or Exception(
+                            f"Seems like there was en error while updating {record['Id']}: {errors}")
+                        pending.append(record)
+            if not pending:
+                break
+            logging.warning(f"[GUSPY] {len(pending)} of {len(records)} {obj} updates failed"
+                            + (", retrying" if attempt < retries else ""))
+        return results
+
+    def ingest(self, obj, operation, records, timeout=None):
+        # Runs a Bulk API 2.0 ingest job over records (dicts holding their "Id"), returning
+        # {Id: True, or the exception for that record}
+        columns = list(dict.fromkeys(['Id'] + [key for record in records for key in record]))
+        content = io.StringIO()
+        writer = csv.DictWriter(content, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(records)
+        job = json.dumps({"object": obj, "operation": operation, "contentType": "CSV", "lineEnding": "LF"})
+        job_id = self.call(lambda: self.soql._call_salesforce("POST", url=GUS_BULK_INGEST_URL, data=job),
+                           idempotent=False).json()['id']
+        url = f"{GUS_BULK_INGEST_URL}/{job_id}"
+        self.call(lambda: self.soql._call_salesforce("PUT", url=f"{url}/batches", data=content.getvalue().encode(),
+                                                     headers={'Content-Type': "text/csv"}), idempotent=False)
+        self.call(lambda: self.soql._call_salesforce("PATCH", url=url, data=json.dumps({"state": "UploadComplete"})))
+        self.wait_job(job_id, timeout=timeout, jobs=GUS_BULK_INGEST_URL)
+
+        def rows(kind):
+            response = self.call(lambda: self.soql._call_salesforce("GET", url=f"{url}/{kind}/"))
+            return csv.DictReader(io.StringIO(response.text))
+
+        results = {record['Id']: Exception(f"[GUSPY] {record['Id']} was not processed by bulk job {job_id}")
+                   for record in records}
+        for row in rows("successfulResults"):
+            results[row['sf__Id'] or row.get('Id')] = True
+        for row in rows("failedResults"):
+            results[row.get('Id') or row['sf__Id']] = Exception(f"Seems like there was en error while updating "
+                                                                f"{row.get('Id')}: {row['sf__Error']}")
+        return results
 
     def chatter(self, data):
         if type(data) != dict:
-            raise f"Please return a dict object with at least body and subjectId"
+            raise TypeError("Please return a dict object with at least body and subjectId")
         else:
             try:
-                res = self.soql._call_salesforce("POST", url=GUS_CHATTER_FEED_URL, data=json.dumps(data))
-                return res
-            except SalesforceExpiredSession as error:
-                self.soql = self.reconnect()
-                res = self.soql._call_salesforce("POST", url=GUS_CHATTER_FEED_URL, data=json.dumps(data))
+                res = self.call(lambda: self.soql._call_salesforce("POST", url=GUS_CHATTER_FEED_URL,
+                                                                   data=json.dumps(data)), idempotent=False)
                 return res
             except Exception as e:
-                raise f"Chattering failed: {e}"
+                raise Exception(f"Chattering failed: {e}") from e
+
+    def chatter_batch(self, posts, retries=1, workers=1):
+        # Posts many feed elements (the same dicts chatter takes) GUS_CHATTER_BATCH at a time. Posts that
+        # fail are retried on their own up to retries times. A batch request that fails as a whole may still
+        # have been posted, so it is not sent again. Returns a list in the order of posts, holding the created
+        # feed element or the exception for that post
+        posts = list(posts)
+        if any(type(data) != dict for data in posts):
+            raise TypeError("Please return a dict object with at least body and subjectId")
+
+        def send(batch):
+            body = json.dumps({"inputs": [{"richInput": posts[index]} for index in batch]})
+            return self.call(lambda: self.soql._call_salesforce("POST", url=GUS_CHATTER_BATCH_URL, data=body),
+                             idempotent=False).json()
+
+        results, pending = [None] * len(posts), list(range(len(posts)))
+        for attempt in range(retries + 1):
+            batches = [pending[index:index + GUS_CHATTER_BATCH] for index in range(0, len(pending), GUS_CHATTER_BATCH)]
+            pending = []
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [(batch, pool.submit(send, batch)) for batch in batches]
+                for batch, future in futures:
+                    try:
+                        outcomes = future.result()['results']
+                    except Exception as e:
+                        for index in batch:
+                            results[index] = Exception(f"Chattering failed: {e}")
+                        continue
+                    for index, outcome in zip(batch, outcomes):
+                        if outcome['statusCode'] < 300:
+                            results[index] = outcome['result']
+                            continue
+                        results[index] = Exception(f"Chattering failed: {outcome['result']}")
+                        pending.append(index)
+            if not pending:
+                break
+            logging.warning(f"[GUSPY] {len(pending)} of {len(posts)} chatter posts failed"
+                            + (", retrying" if attempt < retries else ""))
+        return results
+
+    def fetch_attachment(self, attachment_url, stream=False):
+        url = f"{GUS_BASE_URL}{attachment_url}"
+        header = {'Content-Type': 'application/json', 'Authorization': "Bearer " + self.session_id}
+        response = self.session.get(url, headers=header, stream=stream)
+        if response.status_code == 401:
+            from simple_salesforce.exceptions import SalesforceExpiredSession
+            response.close()
+            raise SalesforceExpiredSession(url, response.status_code, "Attachment", response.content)
+        from guspy.limits import throttled
+        if throttled(response):
+            from simple_salesforce.util import exception_handler
+            exception_handler(response, "Attachment")
+        return response
 
     def get_attachment(self, attachment_url):
-        try:
-            url = f"{GUS_BASE_URL}{attachment_url}"
-            bearer = "Bearer " + self.session_id
-            header = {'Content-Type': 'application/json', 'Authorization': bearer, 'Connection': 'close'}
-            b_attachment_data = requests.get(url, headers=header).content
-            attachment = b_attachment_data.decode("utf-8")
-        except SalesforceExpiredSession as error:
-            self.soql = self.reconnect()
-            url = f"{GUS_BASE_URL}{attachment_url}"
-            bearer = "Bearer " + self.session_id
-            header = {'Content-Type': 'application/json', 'Authorization': bearer, 'Connection': 'close'}
-            b_attachment_data = requests.get(url, headers=header).content
-            attachment = b_attachment_data.decode("utf-8")
+        b_attachment_data = self.call(lambda: self.fetch_attachment(attachment_url).content)
+        attachment = b_attachment_data.decode("utf-8")
         return attachment
+
+    def stream_attachment(self, attachment_url, outfile, chunk_size=GUS_CHUNK_SIZE):
+        response = self.call(lambda: self.fetch_attachment(attachment_url, stream=True))
+        with response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                outfile.write(chunk)
+
+    def download_attachments(self, attachments, directory=None, sink=None, workers=GUS_DOWNLOAD_WORKERS,
+                             chunk_size=GUS_CHUNK_SIZE):
+        # attachments: list of Body URLs, or the DataFrame of an Attachment query (Body, optionally Id/Name)
+        # Each body is written chunk by chunk into directory/<Id>_<Name>, or into the binary file object
+        # returned by sink(url). Returns {url: path or sink object}, holding the exception for failed downloads
+        if sink is None and directory is None:
+            raise ValueError("[GUSPY] Either a directory or a sink is required to download attachments")
+        import pandas as pd
+        if isinstance(attachments, pd.DataFrame):
+            names = [str(row.get('Id') or "") + ("_" + row['Name'] if row.get('Name') else "")
+                     for row in attachments.to_dict('records')]
+            urls = list(attachments['Body'])
+        else:
+            urls = list(attachments)
+            names = [None] * len(urls)
+
+        def download(url, name):
+            if sink:
+                target = sink(url)
+                self.stream_attachment(url, target, chunk_size)
+                return target
+            name = name or url.rstrip('/').split('/')[-2]
+            path = os.path.join(directory, name.replace(os.sep, "_"))
+            try:
+                with open(path, 'wb') as outfile:
+                    self.stream_attachment(url, outfile, chunk_size)
+            except Exception:
+                if os.path.exists(path):
+                    os.remove(path)
+                raise
+            return path
+
+        results = dict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {url: pool.submit(download, url, name) for url, name in zip(urls, names)}
+            for url, future in futures.items():
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    logging.error(f"[GUSPY] Unable to download attachment {url}: {e}")
+                    results[url] = e
+        return results
+
+
+class AsyncGus:
+    # asyncio front-end for Gus: each call runs on a worker pool sized to the connection pool, so many
+    # queries can be awaited concurrently from one event loop while sharing the session and reconnect logic.
+    # The login also runs on the pool, in connect (called by create and async with), so it never blocks the loop
+    def __init__(self, username=None, password=None, otp=None, pool_size=GUS_POOL_SIZE, gus=None):
+        self.username = username
+        self.password = password
+        self.otp = otp
+        self.pool_size = pool_size
+        self.owns_gus = gus is None         # a Gus passed in stays usable after close
+        self.gus = gus
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+
+    @classmethod
+    async def create(cls, username=None, password=None, otp=None, pool_size=GUS_POOL_SIZE, gus=None):
+        async_gus = cls(username=username, password=password, otp=otp, pool_size=pool_size, gus=gus)
+        await async_gus.connect()
+        return async_gus
+
+    async def connect(self):
+        if self.gus is None:
+            self.gus = await self.run(Gus, username=self.username, password=self.password, otp=self.otp,
+                                      pool_size=self.pool_size)
+        return self
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.owns_gus and self.gus is not None:
+            self.gus.session.close()
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def reconnect(self, otp=None):
+        return await self.run(self.gus.refresh, self.gus.generation, otp)
+
+    async def raw(self, query):
+        return await self.run(self.gus.raw, query)
+
+    async def parse(self, query, columnar=False, flatten=False, bulk=None):
+        return await self.run(self.gus.parse, query, columnar=columnar, flatten=flatten, bulk=bulk)
+
+    async def export(self, query, outfile):
+        return await self.run(self.gus.export, query, outfile)
+
+    async def parse_related(self, query):
+        return await self.run(self.gus.parse_related, query)
+
+    async def iter_pages(self, query):
+        pages = self.gus.iter_pages(query)
+        while True:
+            records = await self.run(next, pages, None)
+            if records is None:
+                break
+            yield records
+
+    async def iter_records(self, query):
+        async for records in self.iter_pages(query):
+            for record in records:
+                yield record
+
+    async def update_work(self, id, body):
+        return await self.run(self.gus.update_work, id, body)
+
+    async def chatter(self, data):
+        return await self.run(self.gus.chatter, data)
+
+    async def update_works(self, updates, retries=1):
+        return await self.run(self.gus.update_works, updates, retries=retries)
+
+    async def chatter_batch(self, posts, retries=1):
+        return await self.run(self.gus.chatter_batch, posts, retries=retries)
+
+    async def get_attachment(self, attachment_url):
+        return await self.run(self.gus.get_attachment, attachment_url)
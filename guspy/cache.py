@@ -0,0 +1,154 @@
+import re
+import time
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from guspy.schema import schema
+
+GUS_CACHE_TTL = 300
+
+
+def normalize(query):
+    # Collapses whitespace outside of quoted literals so the same SOQL built in different ways maps to one key
+    return re.sub(r"('(?:[^'\\]|\\.)*')|\s+", lambda match: match.group(1) or " ", query).strip()
+
+
+def query_object(query):
+    # Object of the top-level FROM, skipping quoted literals and the FROMs of parenthesized subqueries
+    depth = 0
+    for match in re.finditer(r"'(?:[^'\\]|\\.)*'|\(|\)|\bFROM\s+(\w+)", query, flags=re.IGNORECASE):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif match.group(1) and depth == 0:
+            return match.group(1)
+    return None
+
+
+class MemoryCache:
+    # In-process LRU, bounded by number of entries and/or total pickled size in bytes. Values are kept pickled so
+    # callers get their own copy and cannot change a cached frame in place
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            blob, expires = entry
+            if expires < time.time():
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+        return pickle.loads(blob)
+
+    def set(self, key, value, ttl):
+        blob = pickle.dumps(value)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (blob, time.time() + ttl)
+            self.size += len(blob)
+            while self.entries and ((self.max_entries and len(self.entries) > self.max_entries) or
+                                    (self.max_bytes and self.size > self.max_bytes)):
+                self.remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        blob, expires = self.entries.pop(key)
+        self.size -= len(blob)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+class SqliteCache:
+    # On-disk LRU shared between processes and runs, with the same bounds as MemoryCache
+    def __init__(self, path, max_entries=1024, max_bytes=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.conn as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, "
+                         "expires REAL, size INTEGER, accessed REAL)")
+
+    def get(self, key):
+        with self.lock, self.conn as conn:
+            row = conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        blob = pickle.dumps(value)
+        now = time.time()
+        with self.lock, self.conn as conn:
+            conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                         (key, blob, now + ttl, len(blob), now))
+            conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            for old_key, old_size in conn.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall():
+                if not ((self.max_entries and count > self.max_entries) or
+                        (self.max_bytes and size > self.max_bytes)):
+                    break
+                conn.execute("DELETE FROM cache WHERE key = ?", (old_key,))
+                count, size = count - 1, size - old_size
+
+    def clear(self):
+        with self.lock, self.conn as conn:
+            conn.execute("DELETE FROM cache")
+
+    def close(self):
+        self.conn.close()
+
+
+class QueryCache:
+    # Caches query results by normalized SOQL. ttls maps object names (e.g. "ScrumMember" or
+    # "ADM_Scrum_Team_Member__c") to their own time-to-live in seconds, falling back to ttl
+    def __init__(self, backend=None, ttl=GUS_CACHE_TTL, ttls=None):
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl
+        self.ttls = {schema().object(name): value for name, value in (ttls or {}).items()}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, query):
+        value = self.backend.get(normalize(query))
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def __contains__(self, query):
+        # Checks for a live entry without counting a hit or miss
+        return self.backend.get(normalize(query)) is not None
+
+    def set(self, query, value):
+        ttl = self.ttls.get(query_object(query), self.ttl)
+        if ttl > 0:
+            self.backend.set(normalize(query), value, ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,143 @@
+import time
+import random
+import threading
+from requests.adapters import HTTPAdapter
+
+GUS_RATE = 25                   # requests per second, shared by every thread of a Gus
+GUS_BURST = 25
+GUS_MIN_RATE = 0.5
+GUS_RECOVERY = 0.05             # share of the configured rate regained after each successful request
+GUS_BUDGET_LOW = 0.2            # below this share of the daily API budget left, rate and concurrency shrink with it
+GUS_RETRIES = 4
+GUS_BACKOFF = 0.5
+GUS_BACKOFF_MAX = 30
+GUS_RETRY_STATUS = (429, 503)
+GUS_RETRY_ERRORS = ("REQUEST_LIMIT_EXCEEDED", "SERVER_UNAVAILABLE", "UNABLE_TO_LOCK_ROW")
+
+
+def usage(header):
+    # Parses a Sforce-Limit-Info header such as "api-usage=1234/15000" into (used, limit)
+    for item in (header or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name == "api-usage" and "/" in value:
+            used, limit = value.split("/", 1)
+            return int(used), int(limit)
+    return None
+
+
+def throttled(response):
+    # Whether Salesforce turned the request away for load or limits, so it can be sent again later
+    if response.status_code in GUS_RETRY_STATUS:
+        return True
+    return response.status_code == 403 and "REQUEST_LIMIT_EXCEEDED" in response.text
+
+
+def transient(error):
+    # Errors worth retrying after a pause: dropped connections, throttled requests and row lock contention
+    import requests
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return True
+    status = getattr(error, 'status', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in GUS_RETRY_STATUS:
+        return True
+    content = str(getattr(error, 'content', "") or "")
+    return any(code in content for code in GUS_RETRY_ERRORS)
+
+
+def refused(error):
+    # Errors that show Salesforce turned the request away unprocessed, so even a write can be sent again
+    status = getattr(error, 'status', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or "REQUEST_LIMIT_EXCEEDED" in str(getattr(error, 'content', "") or "")
+
+
+def backoff(attempt):
+    # Exponential delay with jitter, so threads throttled together do not all come back together
+    return min(GUS_BACKOFF_MAX, GUS_BACKOFF * 2 ** attempt) * random.uniform(0.5, 1)
+
+
+class RateLimiter:
+    # Token bucket shared by the threads of one Gus, also capping the requests in flight. Throttled responses
+    # halve the rate, which then recovers step by step on success. The daily API budget is read from the
+    # Sforce-Limit-Info header; once less than GUS_BUDGET_LOW of it is left, rate and concurrency scale down
+    def __init__(self, rate=GUS_RATE, burst=GUS_BURST, concurrency=None, min_rate=GUS_MIN_RATE):
+        self.ceiling = rate
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.min_rate = min_rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.used, self.limit = None, None
+        self.condition = threading.Condition()
+
+    def remaining(self):
+        if self.limit is None:
+            return None
+        return max(self.limit - self.used, 0)
+
+    def scale(self):
+        if not self.limit:
+            return 1
+        left = self.remaining() / self.limit
+        return 1 if left >= GUS_BUDGET_LOW else left / GUS_BUDGET_LOW
+
+    def current_rate(self):
+        return max(self.min_rate, self.rate * self.scale())
+
+    def current_concurrency(self):
+        if self.concurrency is None:
+            return None
+        return max(1, int(self.concurrency * self.scale()))
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                rate = self.current_rate()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+                self.updated = now
+                concurrency = self.current_concurrency()
+                if concurrency is not None and self.in_flight >= concurrency:
+                    self.condition.wait()           # woken by release
+                elif self.tokens < 1:
+                    self.condition.wait((1 - self.tokens) / rate)
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def observe(self, response):
+        with self.condition:
+            api_usage = usage(response.headers.get('Sforce-Limit-Info'))
+            if api_usage:
+                self.used, self.limit = api_usage
+            if throttled(response):
+                self.rate = max(self.min_rate, self.rate / 2)
+            elif response.status_code < 300:
+                self.rate = min(self.ceiling, self.rate + self.ceiling * GUS_RECOVERY)
+
+    def stats(self):
+        return {"rate": self.current_rate(), "concurrency": self.current_concurrency(), "in_flight": self.in_flight,
+                "used": self.used, "limit": self.limit, "remaining": self.remaining()}
+
+
+class LimitedAdapter(HTTPAdapter):
+    # Connection pool adapter that passes every request of the session through a RateLimiter
+    def __init__(self, limiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.limiter.acquire()
+        try:
+            response = super().send(request, **kwargs)
+        finally:
+            self.limiter.release()
+        self.limiter.observe(response)
+        return response
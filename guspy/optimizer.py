@@ -0,0 +1,68 @@
+from guspy.soql import Select, Eq, In, listify
+from guspy.schema import schema
+from guspy.cache import MemoryCache
+
+GUS_CASE_IDS = 100000
+GUS_CASE_ID_TTL = 10 * 365 * 24 * 60 * 60
+
+
+def case_numbers(node):
+    # Returns the case numbers of a semi-join like "IN (SELECT Id FROM Case WHERE CaseNumber ...)", else None
+    if not isinstance(node, In) or not isinstance(node.values, Select):
+        return None
+    select = node.values
+    if select.obj != schema().object("Case") or select.fields.strip() != "Id" or select.limit:
+        return None
+    if isinstance(select.where, Eq) and select.where.field == "CaseNumber":
+        return [select.where.value]
+    if isinstance(select.where, In) and select.where.field == "CaseNumber" and type(select.where.values) == list:
+        return list(select.where.values)
+    return None
+
+
+class CaseResolver:
+    # Remembers case number -> Id (which never changes) so the Case sub-selects of child object queries
+    # can be replaced by literal Id lists, looking up all unknown numbers in one (batched) query.
+    # The mapping lives in a guspy.cache backend: a bounded MemoryCache, or SqliteCache to keep it on disk
+    def __init__(self, gus, backend=None):
+        self.gus = gus
+        self.backend = backend if backend is not None else MemoryCache(max_entries=GUS_CASE_IDS)
+
+    def get(self, number):
+        return self.backend.get(number)
+
+    def resolve(self, numbers):
+        # Only looks at what is already known, returning {case number: Id}
+        resolved = dict()
+        for number in listify(numbers):
+            case_id = self.backend.get(number)
+            if case_id is not None:
+                resolved[number] = case_id
+        return resolved
+
+    def prefetch(self, numbers):
+        from guspy import Case
+        numbers = list(dict.fromkeys(listify(numbers)))
+        resolved = self.resolve(numbers)
+        missing = [number for number in numbers if number not in resolved]
+        if missing:
+            for query in Case(fields="Id, CaseNumber").batch(case_number=missing):
+                for record in self.gus.iter_records(query):
+                    self.backend.set(record['CaseNumber'], record['Id'], GUS_CASE_ID_TTL)
+                    resolved[record['CaseNumber']] = record['Id']
+        return resolved
+
+    def flatten(self, *trees):
+        # Rewrites every Case semi-join in the given Select trees into literal Id lists. Numbers from all
+        # trees are resolved together first, so the shared sub-select costs a single lookup
+        trees = [tree.tree() if hasattr(tree, 'tree') else tree for tree in trees]
+        joins = [[(node, case_numbers(node)) for node in tree.walk() if case_numbers(node)] for tree in trees]
+        resolved = self.prefetch([number for nodes in joins for node, numbers in nodes for number in numbers])
+        flattened = []
+        for tree, nodes in zip(trees, joins):
+            for node, numbers in nodes:
+                ids = [resolved[number] for number in numbers if number in resolved]
+                if ids:         # with nothing resolved the sub-select is kept, it matches no rows either way
+                    tree = tree.replace(node, Eq(node.field, ids[0]) if len(ids) == 1 else In(node.field, ids))
+            flattened.append(tree)
+        return flattened
@@ -1,41 +1,71 @@
-import os
-import json
-from datetime import datetime, timedelta
-import sys
-try:
-    cli = os.path.abspath(os.path.join(sys.prefix, 'local', 'resources', 'cli.json'))
-    with open(cli, 'r') as infile:
-        cli = json.load(infile)
-except:
-    try:
-        cli = os.path.abspath(os.path.join(sys.prefix, 'resources', 'cli.json'))
-        with open(cli, 'r') as infile:
-            cli = json.load(infile)
-    except:
-        cli = os.path.abspath(os.path.join(sys.prefix, os.path.pardir, 'resources', 'cli.json'))
-        with open(cli, 'r') as infile:
-            cli = json.load(infile)
+import functools
+from datetime import date, datetime, timedelta
+from guspy.resources import commands
+
+
+def __getattr__(name):
+    # cli.json is only read the first time a comment is split, `guspy.parsers.cli` is kept for existing callers
+    if name == "cli":
+        return commands()
+    raise AttributeError(f"module 'guspy.parsers' has no attribute '{name}'")
+
+
+FORMATS = {
+    "SF": "%Y-%m-%d %H:%M:%S",
+    "SOQL": "%Y-%m-%dT%H:%M:%S.%f%z",
+    "common": "%Y-%m-%d",
+}
+GUS_DATETIME_CACHE = 65536
+
+# (start, end) as (hour, minute) per shift, keyed by whether the shift's date is a weekday.
+# Shifts ending at or before their start run overnight into the next day
+SHIFTS = {
+    True: {
+        "SIN": ((1, 0), (9, 0)),
+        "DUB": ((9, 0), (16, 0)),
+        "USA": ((16, 0), (1, 0)),
+        "ALL": ((1, 0), (1, 0)),
+    },
+    False: {
+        "SIN": ((1, 0), (13, 0)),
+        "USA": ((13, 0), (1, 0)),
+        "ALL": ((1, 0), (1, 0)),
+    },
+}
+SHIFT_DAY_START = 1         # every shift day begins at 01:00, before that a timestamp belongs to the previous day
 
 
 def last_item(ls, item):
     return ls.index(item) == (len(ls) - 1)
 
 
+# SOQL results repeat the same timestamps heavily, so parsed values are shared process-wide
+@functools.lru_cache(maxsize=GUS_DATETIME_CACHE)
+def parse_datetime(date_time, format="common"):
+    return datetime.strptime(date_time, FORMATS.get(format, FORMATS["common"]))
+
+
 class DateTimeParser:
+    __slots__ = ("date_time", "format", "parsed")
+
     def __init__(self, date_time, format="common"):
         self.date_time = date_time
         self.format = format
+        self.parsed = None
 
     def convert(self, format="common"):
-        try:
-            if format == "SF":
-                dt = datetime.strptime(self.date_time, "%Y-%m-%d %H:%M:%S")
-            elif format == "SOQL":
-                dt = datetime.strptime(self.date_time, "%Y-%m-%dT%H:%M:%S.%f%z")
-            else:
-                dt = datetime.strptime(self.date_time, "%Y-%m-%d")
-        except:
+        # The result for the instance's own format is kept, so the accessors below parse only once
+        if format == self.format and self.parsed is not None:
+            return self.parsed
+        if isinstance(self.date_time, datetime):
             dt = self.date_time
+        else:
+            try:
+                dt = parse_datetime(self.date_time, format)
+            except (TypeError, ValueError):
+                dt = self.date_time
+        if format == self.format:
+            self.parsed = dt
         return dt
 
     def sf_standard(self):
@@ -70,11 +100,84 @@ class DateTimeParser:
             return False
 
 
+class DateTimeSeriesParser:
+    # Column-wise DateTimeParser: the whole Series (e.g. CreatedDate of a parsed CaseComment query) is
+    # parsed once with pd.to_datetime and an explicit format. Values that do not match become NaT
+    def __init__(self, series, format="common"):
+        import pandas as pd
+        if format not in FORMATS:
+            raise ValueError(f"[DateTimeSeriesParser] Format must be one of {list(FORMATS)}, not {format}")
+        self.format = format
+        if pd.api.types.is_datetime64_any_dtype(series):
+            self.date_time = series
+        else:
+            self.date_time = pd.to_datetime(series, format=FORMATS[format], errors="coerce")
+
+    def convert(self):
+        return self.date_time
+
+    def sf_standard(self):
+        return self.date_time.dt.strftime("%Y-%m-%d %H:%M:%S")
+
+    def soql_standard(self):
+        return self.date_time.dt.strftime("%Y-%m-%dT%H:%M:%S.%f%z") + "Z"
+
+    def easy_view_standard(self):
+        return self.date_time.dt.strftime("%d %b, %I:%M%p")
+
+    def hour(self):
+        return self.date_time.dt.hour
+
+    def day(self):
+        return self.date_time.dt.weekday
+
+    def weekday(self):
+        return self.day() < 5
+
+    def frame(self):
+        import pandas as pd
+        return pd.DataFrame({
+            "date_time": self.date_time,
+            "hour": self.hour(),
+            "day": self.day(),
+            "weekday": self.weekday(),
+            "sf_standard": self.sf_standard(),
+            "soql_standard": self.soql_standard(),
+        })
+
+
+@functools.lru_cache(maxsize=None)
+def command_aliases():
+    # Every alias in cli.json, so a comment's tokens can be matched in a single pass
+    return frozenset(alias for aliases in commands().values() for alias in aliases)
+
+
 class CaseCommentParser:
     def __init__(self, comment):
         self.comment = comment
         self.items = self.comment.split()
 
+    @classmethod
+    def parse_many(cls, comments):
+        # Splits many comment bodies into a DataFrame with one column per cli.json key
+        import pandas as pd
+        columns = {key: [] for key in commands()}
+        for comment in comments:
+            parsed = cls(comment if isinstance(comment, str) else "").split()
+            for key, buffer in columns.items():
+                buffer.append(parsed[key])
+        return pd.DataFrame(columns)
+
+    def tokens(self):
+        # Value following the first occurrence of each alias, the same token search() would return
+        aliases = command_aliases()
+        found = dict()
+        last = len(self.items) - 1
+        for index, item in enumerate(self.items):
+            if item in aliases and item not in found:
+                found[item] = self.items[index + 1] if index < last else None
+        return found
+
     def search(self, word):
         try:
             inx = self.items.index(word)
@@ -90,15 +193,15 @@ class CaseCommentParser:
             return value
 
     def split(self):
+        found = self.tokens()
         parsed = dict()
-        for key, value in cli.items():
+        for key, value in commands().items():
+            parsed[key] = None
             for command in value:
-                result = self.check(self.search(command))
+                result = self.check(found.get(command))
                 if result:
                     parsed[key] = result
                     break
-                elif not result and last_item(value, command):
-                    parsed[key] = None
         parsed = self.format(parsed)
         return parsed
 
@@ -130,31 +233,7 @@ class ShiftParser:
         self.shift = shift
 
     def get_timing(self):
-        start, end = None, None
-        if self.date_time.weekday():
-            if self.shift == "SIN":
-                start = (1, 0)
-                end = (9, 0)
-            elif self.shift == "DUB":
-                start = (9, 0)
-                end = (16, 0)
-            elif self.shift == "USA":
-                start = (16, 0)
-                end = (1, 0)
-            elif self.shift == "ALL":
-                start = (1, 0)
-                end = (1, 0)
-        else:
-            if self.shift == "SIN":
-                start = (1, 0)
-                end = (13, 0)
-            elif self.shift == "USA":
-                start = (13, 0)
-                end = (1, 0)
-            elif self.shift == "ALL":
-                start = (1, 0)
-                end = (1, 0)
-        return start, end
+        return SHIFTS[self.date_time.weekday()].get(self.shift, (None, None))
 
     def get_shifts(self):
         start, end = self.get_timing()
@@ -171,4 +250,86 @@ class ShiftParser:
                             + timedelta(days=1)
             shift_start = DateTimeParser(shift_start).soql_standard()
             shift_end = DateTimeParser(shift_end).soql_standard()
-        return shift_start, shift_end
\ No newline at end of file
+        return shift_start, shift_end
+
+
+def shift_day(value):
+    # Midnight of a "%Y-%m-%d" string, date or datetime
+    if isinstance(value, datetime):
+        day = value
+    elif isinstance(value, date):
+        day = datetime.combine(value, datetime.min.time())
+    else:
+        try:
+            day = parse_datetime(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"[ShiftWindows] {value!r} is not a date, datetime or \"%Y-%m-%d\" string")
+    return day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def shift_windows(start_date, end_date=None, shifts="ALL"):
+    # Returns the (start, end) datetimes of the given shifts on every day from start_date to end_date
+    # (inclusive, "%Y-%m-%d" strings, dates or datetimes), with adjacent or overlapping windows merged
+    if isinstance(shifts, str):
+        shifts = [shifts]
+    day = shift_day(start_date)
+    last = shift_day(end_date if end_date else start_date)
+    windows = []
+    while day <= last:
+        for shift in shifts:
+            timing = SHIFTS[day.weekday() < 5].get(shift)
+            if not timing:
+                continue
+            start, end = timing
+            shift_start = day.replace(hour=start[0], minute=start[1])
+            shift_end = day.replace(hour=end[0], minute=end[1])
+            if shift_end <= shift_start:
+                shift_end += timedelta(days=1)
+            windows.append((shift_start, shift_end))
+        day += timedelta(days=1)
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ShiftSeriesParser:
+    # Assigns every timestamp of a Series to its SIN/DUB/USA shift using the SHIFTS tables, returning
+    # the shift label with its start and end. Timestamps before 01:00 fall in the previous day's USA shift
+    def __init__(self, series, format="SOQL"):
+        self.date_time = DateTimeSeriesParser(series, format=format).convert()
+
+    def frame(self):
+        import numpy as np
+        import pandas as pd
+        shift_day = (self.date_time - pd.Timedelta(hours=SHIFT_DAY_START)).dt.floor("D")
+        offset = (self.date_time - shift_day) / pd.Timedelta(minutes=1)
+        weekday = (shift_day.dt.weekday < 5).to_numpy()
+
+        conditions, labels, starts, ends = [], [], [], []
+        for is_weekday, shifts in SHIFTS.items():
+            for shift, (start, end) in shifts.items():
+                if shift == "ALL":
+                    continue
+                start = start[0] * 60 + start[1]
+                end = end[0] * 60 + end[1]
+                if end <= start:
+                    end += 24 * 60
+                conditions.append((weekday == is_weekday) & (offset >= start).to_numpy() & (offset < end).to_numpy())
+                labels.append(shift)
+                starts.append(start)
+                ends.append(end)
+        label = np.select(conditions, labels, default=None)
+        start = pd.to_timedelta(np.select(conditions, starts, default=np.nan), unit="m")
+        end = pd.to_timedelta(np.select(conditions, ends, default=np.nan), unit="m")
+        return pd.DataFrame({
+            "shift": pd.Series(label, index=self.date_time.index),
+            "shift_start": shift_day + start,
+            "shift_end": shift_day + end,
+        }, index=self.date_time.index)
+
+    def label(self):
+        return self.frame()["shift"]
@@ -0,0 +1,32 @@
+import os
+import sys
+import json
+import functools
+
+
+def locate(name):
+    # Source checkouts keep resources/ beside the package, installs place it under sys.prefix (data_files)
+    candidates = [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.pardir, 'resources', name),
+        os.path.join(sys.prefix, 'resources', name),
+        os.path.join(sys.prefix, 'local', 'resources', name),
+        os.path.join(sys.prefix, os.path.pardir, 'resources', name),
+    ]
+    for path in candidates:
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    raise FileNotFoundError(f"[GUSPY] Unable to locate {name}, looked in: {', '.join(candidates)}")
+
+
+@functools.lru_cache(maxsize=None)
+def load(name):
+    with open(locate(name), 'r') as infile:
+        return json.load(infile)
+
+
+def objects():
+    return load('objects.json')
+
+
+def commands():
+    return load('cli.json')
@@ -0,0 +1,56 @@
+import functools
+from guspy.resources import objects
+
+
+class Schema:
+    # Compiled view of objects.json: validated once, with forward (friendly -> API) and reverse
+    # (API -> friendly) indexes per object so field translation is a single dict lookup
+    def __init__(self, mapping):
+        self.objects = dict()
+        self.forward = dict()
+        self.reverse = dict()
+        for name, entry in mapping.items():
+            if not isinstance(entry, dict) or not isinstance(entry.get("Object"), str):
+                raise ValueError(f"[Schema] {name} must map to a dict with an 'Object' API name")
+            fields = {key: value for key, value in entry.items() if key != "Object"}
+            for key, value in fields.items():
+                if not isinstance(value, str):
+                    raise ValueError(f"[Schema] {name}.{key} must map to an API field name, not {type(value)}")
+            reverse = {value: key for key, value in fields.items()}
+            if len(reverse) != len(fields):
+                raise ValueError(f"[Schema] {name} maps more than one friendly name to the same API field")
+            self.objects[name] = entry["Object"]
+            self.forward[name] = fields
+            self.reverse[name] = reverse
+        # Results can also be looked up by their API object name
+        for name, api_name in self.objects.items():
+            self.forward.setdefault(api_name, self.forward[name])
+            self.reverse.setdefault(api_name, self.reverse[name])
+
+    def __contains__(self, name):
+        return name in self.objects
+
+    def object(self, name):
+        return self.objects.get(name, name)
+
+    def field(self, name, field):
+        return self.forward.get(name, {}).get(field, field)
+
+    def translate(self, name, fields):
+        # Accepts a list or a comma separated string, returning the same type with friendly names replaced
+        forward = self.forward.get(name, {})
+        if isinstance(fields, str):
+            items = [item.strip() for item in fields.split(",")]
+            if all(forward.get(item, item) == item for item in items):
+                return fields
+            return ",".join(forward.get(item, item) for item in items)
+        return [forward.get(item, item) for item in fields]
+
+    def rename(self, name, data):
+        # Renames the columns of a parsed DataFrame from API field names back to friendly names
+        return data.rename(columns=self.reverse.get(name, {}))
+
+
+@functools.lru_cache(maxsize=None)
+def schema():
+    return Schema(objects())
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+
+GUS_SNAPSHOT_FORMAT = "feather"
+GUS_SNAPSHOT_MAX_AGE = 24 * 60 * 60
+
+
+class SnapshotStore:
+    # Persists query results as Feather (default, memory-mappable) or Parquet files, with a small
+    # JSON sidecar holding the query text, fetch time and row count. Requires pyarrow
+    def __init__(self, directory, format=GUS_SNAPSHOT_FORMAT):
+        if format not in ("feather", "parquet"):
+            raise ValueError(f"[SnapshotStore] Format must be 'feather' or 'parquet', not {format}")
+        self.directory = directory
+        self.format = format
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, f"{name}.{self.format}")
+
+    def metadata_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self, name, data, query=None):
+        data = data.reset_index(drop=True)
+        if self.format == "feather":
+            data.to_feather(self.path(name))
+        else:
+            data.to_parquet(self.path(name), index=False)
+        metadata = {"query": query, "fetched_at": time.time(), "rows": len(data), "columns": list(data.columns)}
+        with open(self.metadata_path(name), 'w') as outfile:
+            json.dump(metadata, outfile, indent=2)
+        return metadata
+
+    def load(self, name, columns=None, memory_map=True):
+        # Requested columns the snapshot does not hold (e.g. it saved an empty result) come back empty
+        metadata = self.metadata(name)
+        read = columns
+        if columns and metadata:
+            read = [column for column in columns if column in metadata["columns"]]
+        if self.format == "feather":
+            from pyarrow import feather
+            table = feather.read_table(self.path(name), columns=read, memory_map=memory_map)
+        else:
+            from pyarrow import parquet
+            table = parquet.read_table(self.path(name), columns=read, memory_map=memory_map)
+        data = table.to_pandas()
+        return data.reindex(columns=columns) if columns else data
+
+    def metadata(self, name):
+        try:
+            with open(self.metadata_path(name), 'r') as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            return None
+
+    def exists(self, name):
+        return os.path.exists(self.path(name)) and self.metadata(name) is not None
+
+    def age(self, name):
+        metadata = self.metadata(name)
+        return time.time() - metadata["fetched_at"] if metadata else None
+
+    def is_stale(self, name, max_age=GUS_SNAPSHOT_MAX_AGE, query=None):
+        metadata = self.metadata(name)
+        if not metadata or not os.path.exists(self.path(name)):
+            return True
+        if query is not None and metadata["query"] != query:
+            return True
+        return time.time() - metadata["fetched_at"] > max_age
+
+    def fetch(self, name, gus, query, max_age=GUS_SNAPSHOT_MAX_AGE, columns=None):
+        # Serves the local snapshot while it is fresh, otherwise re-queries GUS and rewrites it
+        if self.is_stale(name, max_age=max_age, query=query):
+            data = gus.parse(query)
+            self.save(name, data, query=query)
+            return data.reindex(columns=columns) if columns else data
+        return self.load(name, columns=columns)
+
+    def remove(self, name):
+        for path in (self.path(name), self.metadata_path(name)):
+            if os.path.exists(path):
+                os.remove(path)
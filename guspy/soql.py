@@ -0,0 +1,232 @@
+import copy
+
+# Keeps each generated IN (...) list well within the SOQL statement and request URI length limits
+GUS_BATCH_CHARS = 4000
+GUS_BATCH_ITEMS = 200
+
+
+def chunk(values, max_chars=GUS_BATCH_CHARS, max_items=GUS_BATCH_ITEMS):
+    # Splits values into lists whose quoted, comma-joined IN clause stays under max_chars and max_items
+    batch, length = [], 0
+    for value in values:
+        size = len(literal(value)) + 1      # quoted and escaped, plus the separating comma
+        if batch and (length + size > max_chars or len(batch) >= max_items):
+            yield batch
+            batch, length = [], 0
+        batch.append(value)
+        length += size
+    if batch:
+        yield batch
+
+
+def literal(value):
+    # Quoted SOQL string literal, with backslashes and quotes escaped
+    value = str(value).replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{value}'"
+
+
+def listify(value):
+    # Accepts a list, a single value, or the pre-quoted "'a','b'" strings the object builders used to take
+    if type(value) == list:
+        return [str(item) for item in value]
+    value = str(value)
+    if "," in value:
+        return [item.strip().strip("'") for item in value.split(",")]
+    return [value]
+
+
+class Node:
+    def render(self):
+        raise NotImplementedError
+
+    def children(self):
+        return []
+
+    def replace(self, target, node):
+        # Returns a copy of the tree with target (matched by identity) swapped for node
+        if self is target:
+            return node
+        children = self.children()
+        replaced = [child.replace(target, node) for child in children]
+        if all(new is old for new, old in zip(replaced, children)):
+            return self
+        clone = copy.copy(self)
+        clone.rebuild(replaced)
+        return clone
+
+    def rebuild(self, children):
+        pass
+
+    def walk(self):
+        yield self
+        for child in self.children():
+            yield from child.walk()
+
+    def __str__(self):
+        return self.render()
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.render() == other.render()
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.render()))
+
+
+class Raw(Node):
+    # Filter text given by the caller (e.g. from guspy.filters), rendered as-is
+    def __init__(self, text):
+        self.text = text
+
+    def render(self):
+        return self.text
+
+
+class Eq(Node):
+    def __init__(self, field, value):
+        self.field = field
+        self.value = value
+
+    def render(self):
+        return f"{self.field} = {literal(self.value)}"
+
+
+class Compare(Node):
+    # Unquoted comparison, e.g. Compare("SystemModstamp", ">", "2021-05-01T00:00:00Z")
+    def __init__(self, field, operator, value):
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def render(self):
+        return f"{self.field} {self.operator} {self.value}"
+
+
+class Like(Node):
+    def __init__(self, field, pattern, identifier="*"):
+        self.field = field
+        self.pattern = pattern.replace(identifier, "%")
+
+    def render(self):
+        return f"{self.field} LIKE {literal(self.pattern)}"
+
+
+class In(Node):
+    # values is either a list of literals or a Select for a semi-join
+    def __init__(self, field, values):
+        self.field = field
+        self.values = values
+
+    def children(self):
+        return [self.values] if isinstance(self.values, Node) else []
+
+    def rebuild(self, children):
+        if children:
+            self.values = children[0]
+
+    def render(self):
+        if isinstance(self.values, Node):
+            return f"{self.field} IN ({self.values.render()})"
+        return f"{self.field} IN ({','.join(literal(value) for value in self.values)})"
+
+
+class Junction(Node):
+    operator = None
+
+    def __init__(self, *clauses):
+        self.clauses = []
+        for clause in clauses:
+            if clause is None:
+                continue
+            if type(clause) == type(self):
+                self.clauses.extend(clause.clauses)
+            else:
+                self.clauses.append(clause)
+
+    def children(self):
+        return list(self.clauses)
+
+    def rebuild(self, children):
+        self.clauses = children
+
+    def render(self):
+        # Nested junctions and caller text (which may hold its own AND/OR) keep their grouping
+        parts = []
+        for clause in self.clauses:
+            text = clause.render()
+            grouped = isinstance(clause, Junction) or (isinstance(clause, Raw) and len(self.clauses) > 1)
+            parts.append(f"({text})" if grouped else text)
+        return f" {self.operator} ".join(parts)
+
+    def simplify(self):
+        # Drops duplicate clauses; under OR, equality and IN tests on the same field become one IN list
+        clauses, merged = [], dict()
+        for clause in self.clauses:
+            if isinstance(clause, Junction):
+                clause = clause.simplify()
+            if isinstance(self, Or) and (isinstance(clause, Eq) or
+                                         (isinstance(clause, In) and not isinstance(clause.values, Node))):
+                items = [clause.value] if isinstance(clause, Eq) else clause.values
+                if clause.field in merged:
+                    existing = merged[clause.field]
+                    existing.values.extend(item for item in items if item not in existing.values)
+                    continue
+                clause = In(clause.field, list(dict.fromkeys(items)))
+                merged[clause.field] = clause
+            if clause not in clauses:
+                clauses.append(clause)
+        for field, clause in merged.items():
+            if len(clause.values) == 1:
+                clauses[clauses.index(clause)] = Eq(field, clause.values[0])
+        if len(clauses) == 1:
+            return clauses[0]
+        return type(self)(*clauses)
+
+
+class And(Junction):
+    operator = "AND"
+
+
+class Or(Junction):
+    operator = "OR"
+
+
+class Select(Node):
+    def __init__(self, fields, obj, where=None, order_by=None, order=None, limit=None):
+        self.fields = fields
+        self.obj = obj
+        self.where = where
+        self.order_by = order_by
+        self.order = order
+        self.limit = limit
+
+    def children(self):
+        return [self.where] if self.where is not None else []
+
+    def rebuild(self, children):
+        self.where = children[0] if children else None
+
+    def render(self):
+        query = f"SELECT {self.fields} FROM {self.obj}"
+        if self.where is not None:
+            query += f" WHERE {self.where.render()}"
+        if self.order_by and self.order:
+            query += f" ORDER BY {self.order_by} {self.order}"
+        if self.limit:
+            query += f" LIMIT {self.limit}"
+        return query
+
+    def simplify(self):
+        if isinstance(self.where, Junction):
+            return self.replace(self.where, self.where.simplify())
+        return self
+
+    def split(self, max_chars=GUS_BATCH_CHARS, max_items=GUS_BATCH_ITEMS):
+        # Yields copies of this query with the longest literal IN list (searching sub-selects as well)
+        # cut into SOQL-safe chunks. Yields the query unchanged if there is nothing to split
+        lists = [node for node in self.walk() if isinstance(node, In) and not isinstance(node.values, Node)]
+        if not lists:
+            yield self
+            return
+        target = max(lists, key=lambda node: len(node.values))
+        for piece in chunk(target.values, max_chars=max_chars, max_items=max_items):
+            yield self.replace(target, In(target.field, piece))
@@ -14,6 +14,7 @@ setuptools.setup(
     long_description_content_type='text/markdown',
     url='https://github.com/cherdon/guspy',
     packages=['guspy'],
+    extras_require={'snapshot': ['pyarrow']},
     data_files=[('resources', ['resources/cli.json', 'resources/objects.json'])],
     classifiers=[
      "Programming Language :: Python :: 3.8",
@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+import unittest
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+from guspy.cache import normalize, query_object, MemoryCache, SqliteCache, QueryCache
+from guspy.access import Gus
+
+
+def make_gus(**kwargs):
+    with mock.patch("simple_salesforce.SalesforceLogin", return_value=("session", "127.0.0.1")):
+        return Gus(username="user@gus.com", password="password", **kwargs)
+
+
+class Keys(unittest.TestCase):
+    def test_normalize_keeps_literals(self):
+        self.assertEqual(normalize("SELECT  Id\n FROM Case WHERE Subject = 'a  b'"),
+                         "SELECT Id FROM Case WHERE Subject = 'a  b'")
+
+    def test_query_object_skips_subqueries(self):
+        self.assertEqual(query_object("SELECT Id, (SELECT Id FROM CaseComments) FROM Case"), "Case")
+        self.assertEqual(query_object("SELECT Id FROM CaseComment WHERE ParentId IN (SELECT Id FROM Case)"),
+                         "CaseComment")
+        self.assertEqual(query_object("SELECT Id FROM ADM_Work__c WHERE Subject__c = 'x (FROM y'"), "ADM_Work__c")
+
+
+class Backends:
+    # Shared by the MemoryCache and SqliteCache test cases, which define make(max_entries, max_bytes)
+    def test_evicts_least_recently_used(self):
+        cache = self.make(max_entries=2)
+        cache.set("a", 1, 60)
+        cache.set("b", 2, 60)
+        cache.get("a")
+        cache.set("c", 3, 60)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_max_bytes(self):
+        cache = self.make(max_entries=None, max_bytes=2500)
+        for key in "abc":
+            cache.set(key, "x" * 1000, 60)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("c"), "x" * 1000)
+
+    def test_ttl_expiry(self):
+        cache = self.make()
+        with mock.patch("guspy.cache.time.time", return_value=1000):
+            cache.set("a", 1, 10)
+        with mock.patch("guspy.cache.time.time", return_value=1005):
+            self.assertEqual(cache.get("a"), 1)
+        with mock.patch("guspy.cache.time.time", return_value=1011):
+            self.assertIsNone(cache.get("a"))
+
+    def test_get_returns_copy(self):
+        cache = self.make()
+        cache.set("a", [1, 2], 60)
+        cache.get("a").append(3)
+        self.assertEqual(cache.get("a"), [1, 2])
+
+
+class Memory(Backends, unittest.TestCase):
+    def make(self, max_entries=1024, max_bytes=None):
+        return MemoryCache(max_entries=max_entries, max_bytes=max_bytes)
+
+
+class Sqlite(Backends, unittest.TestCase):
+    def make(self, max_entries=1024, max_bytes=None):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = SqliteCache(os.path.join(directory.name, "cache.db"), max_entries=max_entries, max_bytes=max_bytes)
+        self.addCleanup(cache.close)
+        return cache
+
+
+class Queries(unittest.TestCase):
+    def test_ttls_by_friendly_or_api_name(self):
+        for name in ("ScrumMember", "ADM_Scrum_Team_Member__c"):
+            cache = QueryCache(ttl=300, ttls={name: 0})
+            cache.set("SELECT Id FROM ADM_Scrum_Team_Member__c", [1])
+            cache.set("SELECT Id FROM Case", [2])
+            self.assertNotIn("SELECT Id FROM ADM_Scrum_Team_Member__c", cache)
+            self.assertIn("SELECT Id FROM Case", cache)
+
+    def test_stats(self):
+        cache = QueryCache()
+        cache.set("SELECT Id FROM Case", [1])
+        cache.get("SELECT  Id FROM Case")
+        cache.get("SELECT Id FROM CaseComment")
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_parse_without_cache(self):
+        gus = make_gus(cache=QueryCache())
+        gus.soql = mock.Mock()
+        gus.soql.query_all.return_value = {"records": [{"attributes": {}, "Id": "500A"}]}
+        gus.parse("SELECT Id FROM Case")
+        gus.parse("SELECT Id FROM Case")
+        self.assertEqual(gus.soql.query_all.call_count, 1)
+        gus.parse("SELECT Id FROM Case", cache=False)
+        self.assertEqual(gus.soql.query_all.call_count, 2)
+        self.assertEqual(gus.cache.stats(), {"hits": 1, "misses": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,616 @@
+import io
+import os
+import asyncio
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy import Case, CaseComment
+from guspy import access
+from guspy.access import Gus, AsyncGus
+from guspy.optimizer import CaseResolver
+from simple_salesforce import Salesforce
+from simple_salesforce.exceptions import SalesforceAuthenticationFailed, SalesforceExpiredSession
+
+
+def login(username, password, session=None):
+    return "session", "127.0.0.1"
+
+
+def make_gus(**kwargs):
+    with mock.patch("simple_salesforce.SalesforceLogin", side_effect=login):
+        return Gus(username="user@gus.com", password="password", **kwargs)
+
+
+class StandIn:
+    # Local HTTP server for the Salesforce endpoints. routes maps (method, path) to a function taking
+    # (query parameters, body) and returning (status, headers, body); every request is kept in requests
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle_request(self):
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stand_in.requests.append((self.command, url.path, body))
+                route = stand_in.routes.get((self.command, url.path))
+                status, headers, content = route(parse_qs(url.query), body) if route else (404, {}, b"[]")
+                if isinstance(content, (dict, list)):
+                    content = json.dumps(content).encode()
+                    headers = dict({'Content-Type': "application/json"}, **headers)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = handle_request
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calls(self, method, path):
+        return [body for request_method, request_path, body in self.requests
+                if request_method == method and request_path == path]
+
+
+class StandInCase(unittest.TestCase):
+    # Gus whose REST client and endpoint URLs point at a StandIn serving self.routes()
+    def routes(self):
+        return dict()
+
+    def setUp(self):
+        self.stand_in = StandIn(self.routes())
+        self.data = f"{self.stand_in.url}/services/data/v52.0"
+        self.gus = make_gus(retries=1)
+        self.gus.soql.base_url = f"{self.data}/"
+        # query_more always builds an https URL from the instance name, so next pages are fetched here
+        self.gus.soql.query_more = lambda url, identifier_is_url=False, **kwargs: \
+            self.gus.soql._call_salesforce("GET", self.stand_in.url + url, **kwargs).json()
+        patches = {"GUS_BULK_QUERY_URL": f"{self.data}/jobs/query", "GUS_BULK_INGEST_URL": f"{self.data}/jobs/ingest",
+                   "GUS_COMPOSITE_URL": f"{self.data}/composite/sobjects",
+                   "GUS_CHATTER_BATCH_URL": f"{self.data}/chatter/feed-elements/batch", "GUS_BULK_POLL": 0}
+        for name, value in patches.items():
+            patcher = mock.patch.object(access, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.stand_in.close)
+
+
+class Optimize(unittest.TestCase):
+    def setUp(self):
+        self.gus = make_gus()
+        self.gus.soql = mock.Mock()
+        self.gus.soql.query.return_value = {"done": True, "totalSize": 2, "records": [
+            {"attributes": {}, "Id": "500A", "CaseNumber": "1"}, {"attributes": {}, "Id": "500B", "CaseNumber": "2"}]}
+        self.gus.soql.query_all.return_value = {"records": [{"attributes": {}, "Id": "00a"}]}
+
+    def test_optimize_select(self):
+        query = self.gus.optimize(CaseComment(fields="Id").select(case_number=["1", "2"]))
+        self.assertEqual(query, "SELECT Id FROM CaseComment WHERE ParentId IN ('500A','500B')")
+
+    def test_optimize_unbuilt_object(self):
+        with self.assertRaises(ValueError):
+            self.gus.optimize(CaseComment(fields="Id"))
+
+    def test_execute_selects(self):
+        results = self.gus.execute({"comments": CaseComment(fields="Id").select(case_number=["1", "2"]),
+                                    "cases": Case(fields="Id").select(case_number="1")}, workers=2, optimize=True)
+        self.assertEqual(list(results["comments"]["Id"]), ["00a"])
+        queries = {call.args[0] for call in self.gus.soql.query_all.call_args_list}
+        self.assertIn("SELECT Id FROM CaseComment WHERE ParentId IN ('500A','500B')", queries)
+        self.assertIn("SELECT Id FROM Case WHERE CaseNumber = '1'", queries)
+        self.assertEqual(self.gus.soql.query.call_count, 1)      # one lookup shared by both queries
+
+
+class CaseLookups(unittest.TestCase):
+    # Gus whose Case lookups answer every number except those starting with "x"
+    def setUp(self):
+        self.gus = mock.Mock()
+        self.gus.cases = CaseResolver(self.gus)
+        self.gus.iter_records.side_effect = self.iter_records
+
+    def iter_records(self, query):
+        numbers = re.findall(r"'([^']*)'", query)
+        return [{"Id": f"500{number}", "CaseNumber": number} for number in numbers if not number.startswith("x")]
+
+    def test_literal_ids_replace_sub_select(self):
+        query = CaseComment(fields="Id", gus=self.gus).create(case_number=["1", "2"])
+        self.assertEqual(query, "SELECT Id FROM CaseComment WHERE ParentId IN ('5001','5002')")
+
+    def test_sub_select_kept_when_nothing_resolves(self):
+        query = CaseComment(fields="Id", gus=self.gus).create(case_number=["x1"])
+        self.assertEqual(query, CaseComment(fields="Id").create(case_number=["x1"]))
+
+    def test_known_numbers_not_looked_up_again(self):
+        self.assertEqual(self.gus.cases.prefetch(["1", "2"]), {"1": "5001", "2": "5002"})
+        self.assertEqual(self.gus.cases.prefetch(["2", "3", "3"]), {"2": "5002", "3": "5003"})
+        queries = [call.args[0] for call in self.gus.iter_records.call_args_list]
+        self.assertEqual(queries[1], "SELECT Id, CaseNumber FROM Case WHERE CaseNumber = '3'")
+
+    def test_prefetch_batches(self):
+        numbers = [str(number) for number in range(450)]
+        resolved = self.gus.cases.prefetch(numbers)
+        self.assertEqual(len(resolved), 450)
+        sizes = [len(re.findall("'", call.args[0])) // 2 for call in self.gus.iter_records.call_args_list]
+        self.assertEqual(sizes, [200, 200, 50])
+
+
+class RelatedResults(unittest.TestCase):
+    def setUp(self):
+        self.gus = make_gus()
+        self.gus.soql = mock.Mock()
+        comments = {"done": False, "totalSize": 3, "nextRecordsUrl": "/comments/2",
+                    "records": [{"attributes": {}, "Id": "00a1", "CreatedBy": {"attributes": {}, "Name": "Ann"}}]}
+        self.gus.soql.query.return_value = {"done": False, "totalSize": 2, "nextRecordsUrl": "/cases/2", "records": [
+            {"attributes": {}, "Id": "500A", "Owner": {"attributes": {}, "Name": "Bob"}, "CaseComments": comments}]}
+        self.pages = {
+            "/cases/2": {"done": True, "totalSize": 2, "records": [
+                {"attributes": {}, "Id": "500B", "Owner": None, "CaseComments": {
+                    "done": True, "totalSize": 1, "records": [{"attributes": {}, "Id": "00a9", "CreatedBy": None}]}}]},
+            "/comments/2": {"done": True, "totalSize": 3, "records": [
+                {"attributes": {}, "Id": "00a2", "CreatedBy": {"attributes": {}, "Name": "Cy"}},
+                {"attributes": {}, "Id": "00a3", "CreatedBy": None}]}}
+        self.gus.soql.query_more.side_effect = lambda url, identifier_is_url=False: self.pages[url]
+
+    def test_flatten(self):
+        children = dict()
+        row = access.flatten({"attributes": {}, "Id": "1", "Owner": {"attributes": {}, "Manager": {"Name": "Di"}},
+                              "CaseComments": {"records": []}}, children=children)
+        self.assertEqual(row, {"Id": "1", "Owner.Manager.Name": "Di"})
+        self.assertEqual(list(children), ["CaseComments"])
+        self.assertEqual(access.flatten({"Id": "1", "CaseComments": {"records": []}}), {"Id": "1"})
+
+    def test_accumulate_drops_null_relationship(self):
+        columns, size = access.accumulate([{"Id": "1", "Owner": None}, {"Id": "2", "Owner": {"Name": "Bob"}}],
+                                          flat=True)
+        self.assertEqual((columns, size), ({"Id": ["1", "2"], "Owner.Name": [None, "Bob"]}, 2))
+        columns, size = access.accumulate([{"Id": "1", "Owner": None}], flat=True)
+        self.assertEqual(columns, {"Id": ["1"], "Owner": [None]})       # kept without dotted columns
+
+    def test_parse_related(self):
+        cases, related = self.gus.parse_related("SELECT Id, Owner.Name, (SELECT Id, CreatedBy.Name FROM "
+                                                "CaseComments) FROM Case")
+        self.assertEqual(list(cases.columns), ["Id", "Owner.Name"])
+        self.assertEqual(list(cases["Id"]), ["500A", "500B"])
+        comments = related["CaseComments"]
+        self.assertEqual(list(comments["Id"]), ["00a1", "00a2", "00a3", "00a9"])
+        self.assertEqual(list(comments[access.GUS_PARENT_COLUMN]), [0, 0, 0, 1])
+        self.assertEqual(list(comments["CreatedBy.Name"][:2]), ["Ann", "Cy"])
+        self.assertNotIn("CreatedBy", comments.columns)
+        parents = cases.loc[comments[access.GUS_PARENT_COLUMN], "Id"]
+        self.assertEqual(list(parents), ["500A", "500A", "500A", "500B"])
+
+
+class BulkQuery(StandInCase):
+    PAGES = [b"Id,CaseNumber,CreatedBy.Name\n1,00012,Ann\n2,00013,\n", b"Id,CaseNumber,CreatedBy.Name\n3,00014,Bob\n"]
+
+    def routes(self):
+        self.polls = 0
+
+        def job(params, body):
+            self.polls += 1
+            return 200, {}, {"id": "750A", "state": "JobComplete" if self.polls > 1 else "InProgress"}
+
+        def results(params, body):
+            index = int(params.get("locator", ["0"])[0])
+            locator = str(index + 1) if index + 1 < len(self.PAGES) else "null"
+            return 200, {'Sforce-Locator': locator, 'Sforce-NumberOfRecords': str(self.PAGES[index].count(b"\n") - 1),
+                         'Content-Type': "text/csv"}, self.PAGES[index]
+
+        def query(params, body):
+            return 200, {}, {"totalSize": 3, "done": False, "nextRecordsUrl": "/services/data/v52.0/query/01g-2000",
+                             "records": [{"attributes": {}, "Id": "1"}]}
+
+        def query_more(params, body):
+            return 200, {}, {"totalSize": 3, "done": True, "records": [{"attributes": {}, "Id": "2"},
+                                                                         {"attributes": {}, "Id": "3"}]}
+
+        return {("POST", "/services/data/v52.0/jobs/query"): lambda params, body: (200, {}, {"id": "750A"}),
+                ("GET", "/services/data/v52.0/jobs/query/750A"): job,
+                ("GET", "/services/data/v52.0/jobs/query/750A/results"): results,
+                ("GET", "/services/data/v52.0/query/"): query,
+                ("GET", "/services/data/v52.0/query/01g-2000"): query_more}
+
+    def test_bulk_job_and_wait(self):
+        self.assertEqual(self.gus.bulk_job("SELECT Id FROM Case"), "750A")
+        submitted = json.loads(self.stand_in.calls("POST", "/services/data/v52.0/jobs/query")[0])
+        self.assertEqual(submitted, {"operation": "query", "query": "SELECT Id FROM Case"})
+        self.assertEqual(self.gus.wait_job("750A")["state"], "JobComplete")
+        self.assertEqual(self.polls, 2)
+
+    def test_failed_job(self):
+        self.stand_in.routes[("GET", "/services/data/v52.0/jobs/query/750A")] = \
+            lambda params, body: (200, {}, {"id": "750A", "state": "Failed", "errorMessage": "bad query"})
+        with self.assertRaisesRegex(Exception, "bad query"):
+            self.gus.wait_job("750A")
+
+    def test_iter_results_follows_locator(self):
+        pages = [response.content for response in self.gus.iter_results("750A", page_size=2)]
+        self.assertEqual(pages, self.PAGES)
+
+    def test_parse_bulk(self):
+        data = self.gus.parse("SELECT Id FROM Case", bulk=True)
+        self.assertEqual(list(data["CaseNumber"]), ["00012", "00013", "00014"])
+        self.assertEqual(list(data.columns), ["Id", "CaseNumber", "CreatedBy.Name"])
+
+    def test_export(self):
+        outfile = io.BytesIO()
+        self.assertEqual(self.gus.export("SELECT Id FROM Case", outfile, chunk_size=8), 3)
+        self.assertEqual(outfile.getvalue(), b"Id,CaseNumber,CreatedBy.Name\n1,00012,Ann\n2,00013,\n3,00014,Bob\n")
+
+    def test_threshold_reuses_first_page(self):
+        self.gus.bulk_threshold = 10
+        data = self.gus.parse("SELECT Id FROM Case")
+        self.assertEqual(list(data["Id"]), ["1", "2", "3"])
+        self.assertEqual(len(self.stand_in.calls("GET", "/services/data/v52.0/query/")), 1)
+        self.assertEqual(self.stand_in.calls("POST", "/services/data/v52.0/jobs/query"), [])
+
+    def test_threshold_results_match_bulk_shape(self):
+        self.gus.bulk_threshold = 10
+        owners = [{"attributes": {}, "Name": "Ann"}, None, {"attributes": {}, "Name": "Bob"}]
+        page = {"totalSize": 3, "done": True, "records": [
+            {"attributes": {}, "Id": str(index + 1), "CaseNumber": f"0001{index + 2}", "CreatedBy": owner}
+            for index, owner in enumerate(owners)]}
+        with mock.patch.object(self.gus.soql, "query", return_value=page):
+            data = self.gus.parse("SELECT Id, CaseNumber, CreatedBy.Name FROM Case")
+        pd.testing.assert_frame_equal(data, self.gus.parse("SELECT Id FROM Case", bulk=True))
+
+    def test_stringify(self):
+        data = access.stringify({"IsClosed": [True, False, None], "Hours": [2, 1.5, None]})
+        self.assertEqual(list(data["IsClosed"][:2]), ["true", "false"])
+        self.assertEqual(list(data["Hours"][:2]), ["2", "1.5"])
+        self.assertTrue(data.iloc[2].isna().all())
+
+    def test_threshold_switches_to_bulk(self):
+        self.gus.bulk_threshold = 2
+        data = self.gus.parse("SELECT Id FROM Case", columnar=True)
+        self.assertEqual(len(data), 3)
+        self.assertEqual(len(self.stand_in.calls("POST", "/services/data/v52.0/jobs/query")), 1)
+        self.assertEqual(self.stand_in.calls("GET", "/services/data/v52.0/query/01g-2000"), [])
+
+
+class BatchedWrites(StandInCase):
+    def routes(self):
+        self.locked = {"a3"}            # fails once with a row lock, then succeeds
+
+        def composite(params, body):
+            outcomes = []
+            for record in json.loads(body)["records"]:
+                if record["id"] == "bad":
+                    outcomes.append({"id": "bad", "success": False,
+                                     "errors": [{"statusCode": "INVALID_FIELD", "message": "nope"}]})
+                elif record["id"] in self.locked:
+                    self.locked.discard(record["id"])
+                    outcomes.append({"id": record["id"], "success": False,
+                                     "errors": [{"statusCode": "UNABLE_TO_LOCK_ROW", "message": "locked"}]})
+                else:
+                    outcomes.append({"id": record["id"], "success": True, "errors": []})
+            return 200, {}, outcomes
+
+        def successful(params, body):
+            rows = body_rows(self.stand_in.calls("PUT", "/services/data/v52.0/jobs/ingest/750J/batches")[0])
+            content = "sf__Id,sf__Created,Id,Status__c\n" + "".join(f"{row[0]},false,{row[0]},{row[1]}\n"
+                                                                    for row in rows if row[0] != "b0")
+            return 200, {'Content-Type': "text/csv"}, content.encode()
+
+        def failed(params, body):
+            return 200, {'Content-Type': "text/csv"}, b"sf__Id,sf__Error,Id,Status__c\n,UNABLE_TO_LOCK_ROW:locked,b0,Fixed\n"
+
+        def body_rows(body):
+            return [line.split(",") for line in body.decode().splitlines()[1:]]
+
+        def chatter(params, body):
+            results = []
+            for item in json.loads(body)["inputs"]:
+                if item["richInput"]["body"] == "bad":
+                    results.append({"statusCode": 400, "result": [{"errorCode": "INVALID", "message": "bad"}]})
+                else:
+                    results.append({"statusCode": 201, "result": {"id": "0D5" + item["richInput"]["subjectId"]}})
+            return 200, {}, {"hasErrors": True, "results": results}
+
+        ingest = "/services/data/v52.0/jobs/ingest"
+        return {("PATCH", "/services/data/v52.0/composite/sobjects"): composite,
+                ("POST", ingest): lambda params, body: (200, {}, {"id": "750J"}),
+                ("PUT", f"{ingest}/750J/batches"): lambda params, body: (201, {}, b""),
+                ("PATCH", f"{ingest}/750J"): lambda params, body: (200, {}, {"id": "750J"}),
+                ("GET", f"{ingest}/750J"): lambda params, body: (200, {}, {"id": "750J", "state": "JobComplete"}),
+                ("GET", f"{ingest}/750J/successfulResults/"): successful,
+                ("GET", f"{ingest}/750J/failedResults/"): failed,
+                ("POST", "/services/data/v52.0/chatter/feed-elements/batch"): chatter}
+
+    def test_update_works_retries_only_failures(self):
+        updates = {f"a{index}": {"Status__c": "Fixed"} for index in range(250)}
+        updates["bad"] = {"Status__c": "Fixed"}
+        results = self.gus.update_works(updates, retries=2)
+        self.assertTrue(all(results[f"a{index}"] is True for index in range(250)))
+        self.assertIsInstance(results["bad"], Exception)
+        self.assertIn("INVALID_FIELD", str(results["bad"]))
+        sizes = [len(json.loads(body)["records"])
+                 for body in self.stand_in.calls("PATCH", "/services/data/v52.0/composite/sobjects")]
+        self.assertEqual(sizes, [200, 51, 2, 1])
+
+    def test_update_works_needs_ids(self):
+        with self.assertRaises(ValueError):
+            self.gus.update_works([{"Status__c": "Fixed"}])
+
+    def test_update_works_bulk(self):
+        updates = [{"Id": f"b{index}", "Status__c": "Fixed"} for index in range(5)]
+        with mock.patch.object(access, "GUS_BULK_WRITE_THRESHOLD", 3):
+            results = self.gus.update_works(updates)
+        self.assertEqual(results, {f"b{index}": True for index in range(5)})
+        uploaded = self.stand_in.calls("PUT", "/services/data/v52.0/jobs/ingest/750J/batches")[0].decode()
+        self.assertEqual(uploaded.splitlines()[0], "Id,Status__c")
+        retried = self.stand_in.calls("PATCH", "/services/data/v52.0/composite/sobjects")
+        self.assertEqual([record["id"] for record in json.loads(retried[0])["records"]], ["b0"])
+
+    def test_chatter_batch(self):
+        posts = [{"body": "done", "subjectId": "500A"}, {"body": "bad", "subjectId": "500B"}]
+        results = self.gus.chatter_batch(posts, retries=1)
+        self.assertEqual(results[0], {"id": "0D5500A"})
+        self.assertIsInstance(results[1], Exception)
+        requests = self.stand_in.calls("POST", "/services/data/v52.0/chatter/feed-elements/batch")
+        self.assertEqual([len(json.loads(body)["inputs"]) for body in requests], [2, 1])
+
+    def test_chatter_batch_type_check(self):
+        with self.assertRaises(TypeError):
+            self.gus.chatter_batch(["not a dict"])
+
+
+class Retries(StandInCase):
+    def routes(self):
+        self.failures = []          # statuses and bodies to answer with before succeeding
+
+        def respond(success):
+            def route(params, body):
+                if self.failures:
+                    status, content = self.failures.pop(0)
+                    return status, {}, content
+                return 200, {}, success
+            return route
+
+        return {("GET", "/services/data/v52.0/query/"): respond({"totalSize": 1, "done": True,
+                                                                "records": [{"attributes": {}, "Id": "1"}]}),
+                ("POST", "/services/data/v40.0/chatter/feed-elements"): respond({"id": "0D5A"})}
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch("guspy.limits.GUS_BACKOFF", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.chatter = "/services/data/v40.0/chatter/feed-elements"
+        feed = mock.patch.object(access, "GUS_CHATTER_FEED_URL", self.stand_in.url + self.chatter)
+        feed.start()
+        self.addCleanup(feed.stop)
+
+    def test_query_retried_when_unavailable(self):
+        self.failures = [(503, [{"errorCode": "SERVER_UNAVAILABLE", "message": "busy"}])]
+        self.assertEqual(self.gus.raw("SELECT Id FROM Case")[0]["Id"], "1")
+        self.assertEqual(len(self.stand_in.calls("GET", "/services/data/v52.0/query/")), 2)
+
+    def test_post_not_resent_when_unavailable(self):
+        self.failures = [(503, [{"errorCode": "SERVER_UNAVAILABLE", "message": "busy"}])]
+        with self.assertRaises(Exception):
+            self.gus.chatter({"body": "done", "subjectId": "500A"})
+        self.assertEqual(len(self.stand_in.calls("POST", self.chatter)), 1)
+
+    def test_post_resent_when_refused(self):
+        self.failures = [(403, [{"errorCode": "REQUEST_LIMIT_EXCEEDED", "message": "ConcurrentRequests"}])]
+        self.assertEqual(self.gus.chatter({"body": "done", "subjectId": "500A"}).json(), {"id": "0D5A"})
+        self.assertEqual(len(self.stand_in.calls("POST", self.chatter)), 2)
+
+    def test_budget_read_from_responses(self):
+        self.stand_in.routes[("GET", "/services/data/v52.0/query/")] = lambda params, body: (
+            200, {'Sforce-Limit-Info': "api-usage=120/15000"}, {"totalSize": 0, "done": True, "records": []})
+        self.gus.raw("SELECT Id FROM Case")
+        self.assertEqual(self.gus.limiter.remaining(), 14880)
+
+
+class Attachments(StandInCase):
+    BODY = "/services/data/v52.0/sobjects/Attachment/{}/Body"
+
+    def routes(self):
+        self.expired = {"00P2"}         # answers 401 once, as if the session had expired
+
+        def body(attachment_id, content):
+            def route(params, body):
+                if attachment_id in self.expired:
+                    self.expired.discard(attachment_id)
+                    return 401, {}, [{"errorCode": "INVALID_SESSION_ID", "message": "Session expired"}]
+                return 200, {'Content-Type': "application/octet-stream"}, content
+            return route
+
+        return {("GET", self.BODY.format("00P1")): body("00P1", b"first body " * 100),
+                ("GET", self.BODY.format("00P2")): body("00P2", b"second body")}
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        patches = [mock.patch.object(access, "GUS_BASE_URL", self.stand_in.url),
+                   mock.patch("simple_salesforce.SalesforceLogin", return_value=("session-2", "127.0.0.1"))]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_data_frame_names_files(self):
+        attachments = pd.DataFrame({"Id": ["00P1", "00P2"], "Name": ["notes.txt", "log.txt"],
+                                    "Body": [self.BODY.format("00P1"), self.BODY.format("00P2")]})
+        results = self.gus.download_attachments(attachments, directory=self.directory.name, chunk_size=16)
+        path = os.path.join(self.directory.name, "00P1_notes.txt")
+        self.assertEqual(results[self.BODY.format("00P1")], path)
+        with open(path, 'rb') as infile:
+            self.assertEqual(infile.read(), b"first body " * 100)
+
+    def test_url_list_to_sink(self):
+        sinks = dict()
+        urls = [self.BODY.format("00P1"), self.BODY.format("00P2")]
+        results = self.gus.download_attachments(urls, sink=lambda url: sinks.setdefault(url, io.BytesIO()))
+        self.assertEqual(results[urls[1]].getvalue(), b"second body")
+        self.assertIs(results[urls[0]], sinks[urls[0]])
+
+    def test_failed_download_removed(self):
+        urls = [self.BODY.format("00P1"), self.BODY.format("00P9")]
+        results = self.gus.download_attachments(urls, directory=self.directory.name)
+        self.assertIsInstance(results[urls[1]], Exception)
+        self.assertEqual(os.listdir(self.directory.name), ["00P1"])
+
+    def test_needs_directory_or_sink(self):
+        with self.assertRaises(ValueError):
+            self.gus.download_attachments([self.BODY.format("00P1")])
+
+    def test_expired_session_refreshed(self):
+        self.assertEqual(self.gus.get_attachment(self.BODY.format("00P2")), "second body")
+        self.assertEqual(self.gus.session_id, "session-2")
+        self.assertEqual(self.gus.generation, 1)
+        self.assertEqual(len(self.stand_in.calls("GET", self.BODY.format("00P2"))), 2)
+
+    def test_stream_attachment(self):
+        outfile = io.BytesIO()
+        self.gus.stream_attachment(self.BODY.format("00P1"), outfile, chunk_size=7)
+        self.assertEqual(outfile.getvalue(), b"first body " * 100)
+
+
+class SessionRefresh(unittest.TestCase):
+    # Many threads sharing one Gus whose session expires; logins counts the SalesforceLogin attempts
+    def setUp(self):
+        self.logins = []
+        self.valid = "session"
+        self.failing = False
+        self.gus = make_gus()
+        self.logins.clear()
+        patches = [mock.patch("simple_salesforce.SalesforceLogin", side_effect=self.login),
+                   mock.patch.object(Salesforce, "query_all", autospec=True, side_effect=self.query_all)]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def login(self, username, password, session=None):
+        self.logins.append(username)
+        time.sleep(0.05)
+        if self.failing:
+            raise SalesforceAuthenticationFailed("INVALID_LOGIN", "Invalid username or password")
+        return f"session-{len(self.logins)}", "127.0.0.1"
+
+    def query_all(self, client, query, **kwargs):
+        time.sleep(0.01)
+        if client.session_id != self.valid:
+            raise SalesforceExpiredSession("url", 401, "query", [{"errorCode": "INVALID_SESSION_ID"}])
+        return {"records": [{"attributes": {}, "Id": client.session_id}]}
+
+    def run_threads(self, threads=32):
+        def raw(_):
+            try:
+                return self.gus.raw("SELECT Id FROM Case")[0]["Id"]
+            except Exception as e:
+                return e
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            return list(pool.map(raw, range(threads)))
+
+    def test_single_login_on_expiry(self):
+        self.valid = "session-1"
+        self.assertEqual(set(self.run_threads()), {"session-1"})
+        self.assertEqual(len(self.logins), 1)
+        self.assertEqual(self.gus.generation, 1)
+
+    def test_failed_login_is_not_repeated(self):
+        self.valid = "session-1"
+        self.failing = True
+        results = self.run_threads(8)
+        self.assertTrue(all(isinstance(result, Exception) for result in results))
+        self.assertEqual(len(self.logins), 1)
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                self.gus.raw("SELECT Id FROM Case")
+        self.assertEqual(len(self.logins), 1)
+        self.assertEqual(self.gus.generation, 0)
+        self.assertIsNotNone(self.gus.failed_login)
+        self.assertEqual(self.gus.session_id, "session")
+
+    def test_login_again_after_cooldown(self):
+        self.valid = "session-2"
+        self.failing = True
+        self.run_threads(4)
+        self.failing = False
+        with mock.patch.object(access, "GUS_LOGIN_COOLDOWN", 0):
+            self.assertEqual(self.gus.raw("SELECT Id FROM Case")[0]["Id"], "session-2")
+        self.assertEqual(len(self.logins), 2)
+
+    def test_proactive_refresh(self):
+        self.valid = "session-1"
+        self.gus.last_used -= self.gus.session_refresh + 1
+        self.assertEqual(set(self.run_threads(8)), {"session-1"})
+        self.assertEqual(len(self.logins), 1)
+
+
+class AsyncCalls(unittest.TestCase):
+    def test_awaits_overlap(self):
+        gus = mock.Mock()
+        gus.raw.side_effect = lambda query: time.sleep(0.2) or [query]
+
+        async def gather():
+            async with AsyncGus(gus=gus, pool_size=4) as async_gus:
+                queries = [f"SELECT Id FROM Case LIMIT {size}" for size in range(4)]
+                return await asyncio.gather(*(async_gus.raw(query) for query in queries))
+        start = time.monotonic()
+        results = asyncio.run(gather())
+        self.assertLess(time.monotonic() - start, 0.6)
+        self.assertEqual(results[3], ["SELECT Id FROM Case LIMIT 3"])
+        gus.session.close.assert_not_called()
+
+    def test_login_off_the_event_loop(self):
+        threads = []
+
+        def login(username, password, session=None):
+            threads.append(threading.current_thread())
+            return "session", "127.0.0.1"
+
+        async def enter():
+            async_gus = AsyncGus(username="user@gus.com", password="password")
+            self.assertEqual(threads, [])               # nothing happens before it is awaited
+            async with async_gus:
+                return async_gus
+
+        with mock.patch("simple_salesforce.SalesforceLogin", side_effect=login):
+            async_gus = asyncio.run(enter())
+            created = asyncio.run(AsyncGus.create(username="user@gus.com", password="password"))
+            created.close()
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(thread is not threading.main_thread() for thread in threads))
+        self.assertEqual(async_gus.gus.session_id, "session")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+from guspy.limits import RateLimiter, usage, throttled, transient, refused
+
+
+def response(status=200, text="", limit_info=None):
+    return mock.Mock(status_code=status, text=text, headers={'Sforce-Limit-Info': limit_info} if limit_info else {})
+
+
+class Usage(unittest.TestCase):
+    def test_api_usage(self):
+        self.assertEqual(usage("api-usage=18/15000"), (18, 15000))
+        self.assertEqual(usage("per-app-api-usage=1/2(appName=x), api-usage=25/5000"), (25, 5000))
+        self.assertIsNone(usage(None))
+
+    def test_throttled(self):
+        self.assertTrue(throttled(response(503)))
+        self.assertTrue(throttled(response(403, '[{"errorCode": "REQUEST_LIMIT_EXCEEDED"}]')))
+        self.assertFalse(throttled(response(403, '[{"errorCode": "INSUFFICIENT_ACCESS"}]')))
+
+    def test_transient_and_refused(self):
+        unavailable = mock.Mock(status=503, content=None)
+        limited = mock.Mock(status=403, content=[{"errorCode": "REQUEST_LIMIT_EXCEEDED"}])
+        self.assertTrue(transient(unavailable))
+        self.assertFalse(refused(unavailable))
+        self.assertTrue(transient(limited))
+        self.assertTrue(refused(limited))
+
+
+class Limiter(unittest.TestCase):
+    def test_throttling_halves_and_recovers(self):
+        limiter = RateLimiter(rate=10)
+        limiter.observe(response(503))
+        self.assertEqual(limiter.rate, 5)
+        for _ in range(20):
+            limiter.observe(response(200))
+        self.assertEqual(limiter.rate, 10)
+
+    def test_budget_scales_down(self):
+        limiter = RateLimiter(rate=10, concurrency=8)
+        limiter.observe(response(200, limit_info="api-usage=9900/10000"))
+        self.assertEqual(limiter.remaining(), 100)
+        self.assertAlmostEqual(limiter.current_rate(), 0.5)
+        self.assertEqual(limiter.current_concurrency(), 1)
+
+    def test_concurrency_cap(self):
+        limiter = RateLimiter(rate=1000, burst=1000, concurrency=3)
+        state = {"now": 0, "most": 0}
+        lock = threading.Lock()
+
+        def request(_):
+            limiter.acquire()
+            with lock:
+                state["now"] += 1
+                state["most"] = max(state["most"], state["now"])
+            time.sleep(0.01)
+            with lock:
+                state["now"] -= 1
+            limiter.release()
+
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            list(pool.map(request, range(36)))
+        self.assertEqual(state["most"], 3)
+
+    def test_rate(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(11):
+            limiter.acquire()
+            limiter.release()
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+
+if __name__ == '__main__':
+    unittest.main()
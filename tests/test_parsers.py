@@ -0,0 +1,168 @@
+import os
+import sys
+import unittest
+from datetime import date, datetime
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy import ReleaseEvent
+from guspy.parsers import CaseCommentParser, DateTimeParser, DateTimeSeriesParser, ShiftSeriesParser, parse_datetime, \
+    shift_windows
+from guspy.resources import commands
+
+
+class DateTimeParsing(unittest.TestCase):
+    VALUES = {"SF": ["2021-05-03 08:59:00", "2021-05-08 23:15:30"],
+              "SOQL": ["2021-05-03T08:59:00.000+0000", "2021-05-08T23:15:30.250+0000"],
+              "common": ["2021-05-03", "2021-05-08"]}
+
+    def test_series_matches_scalar(self):
+        for format, values in self.VALUES.items():
+            series = DateTimeSeriesParser(pd.Series(values), format=format)
+            scalars = [DateTimeParser(value, format=format) for value in values]
+            self.assertEqual(list(series.convert()), [parse_datetime(value, format) for value in values])
+            self.assertEqual(list(series.hour()), [scalar.hour() for scalar in scalars])
+            self.assertEqual(list(series.day()), [scalar.day() for scalar in scalars])
+            self.assertEqual(list(series.weekday()), [scalar.weekday() for scalar in scalars])
+            self.assertEqual(list(series.sf_standard()), [scalar.sf_standard() for scalar in scalars])
+            self.assertEqual(list(series.soql_standard()), [scalar.soql_standard() for scalar in scalars])
+            self.assertEqual(list(series.easy_view_standard()), [scalar.easy_view_standard() for scalar in scalars])
+
+    def test_invalid_values_become_nat(self):
+        series = DateTimeSeriesParser(pd.Series(["2021-05-03", "03/05/2021", None]), format="common")
+        self.assertEqual(list(series.convert().isna()), [False, True, True])
+
+    def test_scalar_keeps_bad_input(self):
+        self.assertEqual(DateTimeParser("03/05/2021").convert(), "03/05/2021")
+        self.assertIsNone(DateTimeParser(None).convert())
+        parsed = datetime(2021, 5, 3, 8, 59)
+        self.assertIs(DateTimeParser(parsed, format="SF").convert("SF"), parsed)
+
+    def test_scalar_parses_once(self):
+        parser = DateTimeParser("2021-05-03 08:59:00", format="SF")
+        self.assertIs(parser.convert("SF"), parser.convert("SF"))
+        self.assertEqual(parser.convert("common"), "2021-05-03 08:59:00")     # other formats are not kept
+
+    def test_unknown_series_format(self):
+        with self.assertRaises(ValueError):
+            DateTimeSeriesParser(pd.Series(["2021-05-03"]), format="ISO")
+
+
+class CommentSplitting(unittest.TestCase):
+    COMMENTS = ["Datacenter: DFW Status: Done -instance na1 -c restart",
+                "-instance -cluster cs2 -c",                                   # flag followed by another flag
+                "-c restart -instance na1 -instance na2 -c stop",              # repeated aliases
+                "-cluster cs3 -instance",                                      # alias as the last token
+                "-versions app@230.1,patch@2 -chatter_status_group \"Release Team\"",
+                "-versions 230.1 -chatter_status_group \"Ops\"",
+                ""]
+
+    def searched(self, comment):
+        # What split returned when every alias was looked up with search()
+        parser = CaseCommentParser(comment)
+        parsed = dict()
+        for key, aliases in commands().items():
+            parsed[key] = next((value for value in map(parser.search, aliases) if parser.check(value)), None)
+        return parser.format(parsed)
+
+    def test_split_matches_search(self):
+        for comment in self.COMMENTS:
+            parser = CaseCommentParser(comment)
+            self.assertEqual(parser.split(), self.searched(comment), comment)
+            for alias, value in parser.tokens().items():
+                self.assertEqual(value, parser.search(alias), comment)
+
+    def test_values(self):
+        self.assertEqual(CaseCommentParser(self.COMMENTS[1]).split()["Instance"], "cs2")
+        self.assertIsNone(CaseCommentParser(self.COMMENTS[1]).split()["Command"])
+        self.assertEqual(CaseCommentParser(self.COMMENTS[2]).split()["Instance"], "na1")
+        self.assertEqual(CaseCommentParser(self.COMMENTS[3]).split()["Instance"], "cs3")
+
+    def test_version_and_chatter_formatting(self):
+        parsed = CaseCommentParser(self.COMMENTS[4]).split()
+        self.assertEqual((parsed["Version"], parsed["Chatter"]), ("230.1", "Release"))
+        parsed = CaseCommentParser(self.COMMENTS[5]).split()
+        self.assertEqual((parsed["Version"], parsed["Chatter"]), ("230.1", "Ops"))
+
+    def test_parse_many(self):
+        data = CaseCommentParser.parse_many([self.COMMENTS[0], None, float("nan")])
+        self.assertEqual(list(data.columns), list(commands()))
+        self.assertEqual(data["Instance"][0], "na1")
+        self.assertTrue(data.iloc[1:].isna().all().all())
+
+
+class ShiftBucketing(unittest.TestCase):
+    def setUp(self):
+        self.events = pd.Series(["2021-05-03T00:30:00.000+0000",     # Monday before 01:00, Sunday's USA shift
+                                 "2021-05-03T08:59:00.000+0000",
+                                 "2021-05-03T09:00:00.000+0000",
+                                 "2021-05-03T20:00:00.000+0000",
+                                 "2021-05-08T12:00:00.000+0000",     # Saturday, weekend timings
+                                 "2021-05-08T13:00:00.000+0000",
+                                 None])
+        self.shifts = ShiftSeriesParser(self.events, format="SOQL").frame()
+
+    def test_labels(self):
+        self.assertEqual(list(self.shifts["shift"][:6]), ["USA", "SIN", "DUB", "USA", "SIN", "USA"])
+        self.assertTrue(pd.isna(self.shifts["shift"][6]))
+
+    def test_windows(self):
+        self.assertEqual(str(self.shifts["shift_start"][0]), "2021-05-02 13:00:00+00:00")
+        self.assertEqual(str(self.shifts["shift_end"][0]), "2021-05-03 01:00:00+00:00")
+        self.assertEqual(str(self.shifts["shift_start"][2]), "2021-05-03 09:00:00+00:00")
+        self.assertEqual(str(self.shifts["shift_end"][3]), "2021-05-04 01:00:00+00:00")
+        self.assertTrue(pd.isna(self.shifts["shift_start"][6]))
+
+    def test_label_keeps_index(self):
+        events = pd.Series(["2021-05-03T02:00:00.000+0000"], index=[42])
+        self.assertEqual(ShiftSeriesParser(events).label().to_dict(), {42: "SIN"})
+
+
+class ShiftWindows(unittest.TestCase):
+    def test_single_shift_per_day(self):
+        self.assertEqual(shift_windows("2021-05-03", "2021-05-04", "SIN"),
+                         [(datetime(2021, 5, 3, 1), datetime(2021, 5, 3, 9)),
+                          (datetime(2021, 5, 4, 1), datetime(2021, 5, 4, 9))])
+
+    def test_adjacent_shifts_merge(self):
+        self.assertEqual(shift_windows("2021-05-03", shifts=["SIN", "DUB"]),
+                         [(datetime(2021, 5, 3, 1), datetime(2021, 5, 3, 16))])
+
+    def test_whole_days_merge_into_one_window(self):
+        self.assertEqual(shift_windows("2021-05-03", "2021-05-09"),
+                         [(datetime(2021, 5, 3, 1), datetime(2021, 5, 10, 1))])
+
+    def test_dates_and_datetimes(self):
+        expected = shift_windows("2021-05-03", "2021-05-04", "SIN")
+        self.assertEqual(shift_windows(date(2021, 5, 3), date(2021, 5, 4), "SIN"), expected)
+        self.assertEqual(shift_windows(datetime(2021, 5, 3, 12), datetime(2021, 5, 4, 0, 30), "SIN"), expected)
+        self.assertEqual(ReleaseEvent(fields="Name").create(date=date(2021, 5, 3), shift=["SIN", "DUB"]),
+                         ReleaseEvent(fields="Name").create(date="2021-05-03", shift=["SIN", "DUB"]))
+
+    def test_unparseable_dates(self):
+        for value in ("03/05/2021", None, 20210503):
+            with self.assertRaisesRegex(ValueError, r"\[ShiftWindows\]"):
+                shift_windows(value)
+        with self.assertRaisesRegex(ValueError, r"\[ShiftWindows\] 'May 4'"):
+            shift_windows("2021-05-03", "May 4")
+
+    def test_shift_missing_on_weekends(self):
+        self.assertEqual(shift_windows("2021-05-08", "2021-05-09", "DUB"), [])
+
+    def test_release_event_predicate(self):
+        self.assertEqual(ReleaseEvent(fields="Name").create(date="2021-05-03", shift=["SIN", "DUB"]),
+                         "SELECT Name FROM ADM_Release_Event__c WHERE "
+                         "Scheduled_Start__c < 2021-05-03T16:00:00Z AND Scheduled_End__c > 2021-05-03T01:00:00Z")
+
+    def test_release_event_without_windows(self):
+        with self.assertRaises(ValueError):
+            ReleaseEvent(fields="Name").create(date="2021-05-08", shift="DUB")
+
+
+if __name__ == '__main__':
+    unittest.main()
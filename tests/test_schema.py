@@ -0,0 +1,68 @@
+import os
+import sys
+import unittest
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy.schema import Schema, schema
+
+MAPPING = {"Comment": {"Object": "CaseComment", "Body": "CommentBody", "Created.Name": "CreatedBy.Name"}}
+
+
+class Validation(unittest.TestCase):
+    def test_entry_not_a_dict(self):
+        with self.assertRaisesRegex(ValueError, r"\[Schema\] Comment must map to a dict"):
+            Schema({"Comment": ["CaseComment"]})
+
+    def test_missing_object(self):
+        with self.assertRaisesRegex(ValueError, r"\[Schema\] Comment must map to a dict"):
+            Schema({"Comment": {"Body": "CommentBody"}})
+
+    def test_field_not_a_string(self):
+        with self.assertRaisesRegex(ValueError, r"\[Schema\] Comment.Body must map to an API field name"):
+            Schema({"Comment": {"Object": "CaseComment", "Body": ["CommentBody"]}})
+
+    def test_duplicate_api_field(self):
+        with self.assertRaisesRegex(ValueError, r"\[Schema\] Comment maps more than one friendly name"):
+            Schema({"Comment": {"Object": "CaseComment", "Body": "CommentBody", "Text": "CommentBody"}})
+
+    def test_shipped_objects_are_valid(self):
+        self.assertIn("Case", schema())
+
+
+class Translation(unittest.TestCase):
+    def setUp(self):
+        self.schema = Schema(MAPPING)
+
+    def test_object_and_field(self):
+        self.assertEqual(self.schema.object("Comment"), "CaseComment")
+        self.assertEqual(self.schema.object("Unknown"), "Unknown")
+        self.assertEqual(self.schema.field("Comment", "Body"), "CommentBody")
+        self.assertEqual(self.schema.field("Comment", "Id"), "Id")
+
+    def test_translate_list(self):
+        self.assertEqual(self.schema.translate("Comment", ["Id", "Body", "Created.Name"]),
+                         ["Id", "CommentBody", "CreatedBy.Name"])
+
+    def test_translate_string(self):
+        self.assertEqual(self.schema.translate("Comment", "Id, Body"), "Id,CommentBody")
+        self.assertEqual(self.schema.translate("Comment", "Id, ParentId"), "Id, ParentId")     # left as given
+
+    def test_lookup_by_api_object_name(self):
+        self.assertEqual(self.schema.translate("CaseComment", ["Body"]), ["CommentBody"])
+        self.assertEqual(self.schema.field("CaseComment", "Created.Name"), "CreatedBy.Name")
+        self.assertNotIn("CaseComment", self.schema)
+
+    def test_rename(self):
+        data = pd.DataFrame({"Id": ["1"], "CommentBody": ["text"], "CreatedBy.Name": ["Ann"]})
+        for name in ("Comment", "CaseComment"):
+            self.assertEqual(list(self.schema.rename(name, data).columns), ["Id", "Body", "Created.Name"])
+
+
+if __name__ == '__main__':
+    unittest.main()
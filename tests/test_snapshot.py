@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import unittest
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy.snapshot import SnapshotStore
+
+QUERY = "SELECT Id, Name FROM ADM_Instance__c"
+
+
+class Snapshots(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.gus = mock.Mock()
+        self.gus.parse.return_value = pd.DataFrame({"Id": ["a01", "a02"], "Name": ["na1", "na2"]})
+
+    def test_round_trip(self):
+        for format in ("feather", "parquet"):
+            store = SnapshotStore(self.directory, format=format)
+            store.save("instances", self.gus.parse.return_value, query=QUERY)
+            pd.testing.assert_frame_equal(store.load("instances"), self.gus.parse.return_value)
+            self.assertEqual(store.metadata("instances")["rows"], 2)
+
+    def test_column_projection(self):
+        store = SnapshotStore(self.directory)
+        store.fetch("instances", self.gus, QUERY)
+        self.assertEqual(list(store.load("instances", columns=["Name"]).columns), ["Name"])
+        self.assertEqual(list(store.fetch("instances", self.gus, QUERY, columns=["Name"])["Name"]), ["na1", "na2"])
+
+    def test_fresh_snapshot_served_locally(self):
+        store = SnapshotStore(self.directory)
+        store.fetch("instances", self.gus, QUERY)
+        store.fetch("instances", self.gus, QUERY)
+        self.assertEqual(self.gus.parse.call_count, 1)
+        self.assertFalse(store.is_stale("instances"))
+
+    def test_stale_snapshot_refetched(self):
+        store = SnapshotStore(self.directory)
+        with mock.patch("guspy.snapshot.time.time", return_value=1000):
+            store.fetch("instances", self.gus, QUERY)
+        with mock.patch("guspy.snapshot.time.time", return_value=1000 + 3601):
+            self.assertTrue(store.is_stale("instances", max_age=3600))
+            store.fetch("instances", self.gus, QUERY, max_age=3600)
+        self.assertEqual(self.gus.parse.call_count, 2)
+
+    def test_changed_query_refetched(self):
+        store = SnapshotStore(self.directory)
+        store.fetch("instances", self.gus, QUERY)
+        store.fetch("instances", self.gus, QUERY + " LIMIT 1")
+        self.assertEqual(self.gus.parse.call_count, 2)
+        self.assertEqual(store.metadata("instances")["query"], QUERY + " LIMIT 1")
+
+    def test_empty_result_with_columns(self):
+        store = SnapshotStore(self.directory)
+        self.gus.parse.return_value = pd.DataFrame()
+        self.assertEqual(list(store.fetch("instances", self.gus, QUERY, columns=["Name"]).columns), ["Name"])
+        data = store.fetch("instances", self.gus, QUERY, columns=["Name"])
+        self.assertEqual((list(data.columns), len(data)), (["Name"], 0))
+        self.assertEqual(self.gus.parse.call_count, 1)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            SnapshotStore(self.directory, format="csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
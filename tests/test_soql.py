@@ -0,0 +1,108 @@
+import os
+import sys
+import tempfile
+import unittest
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy import Case, CaseComment, Chatter, ClusterInstanceLink, Query
+from guspy.filters import equals, is_in, bracket
+from guspy.schema import schema
+from guspy.soql import Select, Eq, In, And, Or, chunk, literal
+from guspy.sync import IncrementalSync
+
+
+class RenderParity(unittest.TestCase):
+    # Expected strings are what the string builders produced before queries became a tree
+
+    def test_case_single(self):
+        self.assertEqual(Case(fields="Id, Status").create(case_number="8938202"),
+                         "SELECT Id, Status FROM Case WHERE CaseNumber = '8938202'")
+
+    def test_case_list(self):
+        self.assertEqual(Case().create(case_number=["1", "2"]),
+                         "SELECT Id FROM Case WHERE CaseNumber IN ('1','2')")
+
+    def test_case_quoted_string(self):
+        self.assertEqual(Case().create(case_number="'1','2'"),
+                         "SELECT Id FROM Case WHERE CaseNumber IN ('1','2')")
+
+    def test_semi_join(self):
+        case_id = Case(filters=is_in("CaseNumber", bracket("'1','2'"))).create()
+        expected = Query("CaseComment").create("Id, CommentBody", filters=is_in("ParentId", bracket(case_id)))
+        self.assertEqual(CaseComment(fields="Id, CommentBody").create(case_number=["1", "2"]), expected)
+
+    def test_chatter(self):
+        self.assertEqual(Chatter(fields="Id").create(case_id="500x"),
+                         Query("Chatter").create("Id", filters=equals("ParentId", "500x")))
+
+    def test_cluster_instance_link(self):
+        field = schema().field("ClusterInstanceLink", "Instance")
+        self.assertEqual(ClusterInstanceLink(fields="Id").create(instances=["na1", "na2"]),
+                         Query("ClusterInstanceLink").create("Id", filters=is_in(field, bracket("'na1','na2'"))))
+
+    def test_sort_and_limit(self):
+        self.assertEqual(Case(fields="Id", sort_by="CreatedDate", sort_seq="DESC", limit=5).create(),
+                         "SELECT Id FROM Case ORDER BY CreatedDate DESC LIMIT 5")
+
+
+class Rendering(unittest.TestCase):
+    def test_raw_filter_keeps_grouping(self):
+        self.assertEqual(Case(filters="Status = 'New' OR Status = 'Open'").create(case_number="1"),
+                         "SELECT Id FROM Case WHERE (Status = 'New' OR Status = 'Open') AND CaseNumber = '1'")
+
+    def test_lone_raw_filter_unchanged(self):
+        self.assertEqual(Case(filters="Status = 'New'").create(), "SELECT Id FROM Case WHERE Status = 'New'")
+
+    def test_nested_junctions(self):
+        where = And(Or(Eq("A", "1"), Eq("B", "2")), Eq("C", "3"))
+        self.assertEqual(where.render(), "(A = '1' OR B = '2') AND C = '3'")
+
+    def test_literal_escaping(self):
+        self.assertEqual(literal("O'Brien"), "'O\\'Brien'")
+        self.assertEqual(literal("a\\b"), "'a\\\\b'")
+        self.assertEqual(Case().create(case_number="O'Brien"), "SELECT Id FROM Case WHERE CaseNumber = 'O\\'Brien'")
+
+    def test_simplify_merges_or(self):
+        where = Or(Eq("A", "1"), In("A", ["2", "1"]), Eq("B", "3")).simplify()
+        self.assertEqual(where.render(), "A IN ('1','2') OR B = '3'")
+
+    def test_split(self):
+        select = Select("Id", "Case", where=In("CaseNumber", [str(number) for number in range(450)]))
+        pieces = list(select.split())
+        self.assertEqual(len(pieces), 3)
+        self.assertTrue(all(piece.render().startswith("SELECT Id FROM Case WHERE CaseNumber IN (") for piece in pieces))
+
+    def test_chunk_limits(self):
+        batches = list(chunk(["x" * 10] * 50, max_chars=100, max_items=200))
+        self.assertTrue(all(len(",".join(literal(value) for value in batch)) <= 100 for batch in batches))
+
+
+class SyncGrouping(unittest.TestCase):
+    def test_base_and_delta_queries_group_filters_alike(self):
+        gus = mock.Mock()
+        gus.parse.return_value = pd.DataFrame({"Id": ["1"], "SystemModstamp": ["2021-05-01T00:00:00.000+0000"]})
+        with tempfile.TemporaryDirectory() as directory:
+            sync = IncrementalSync(gus, directory)
+            case = Case(fields="Id", filters="Status = 'New' OR Status = 'Open'")
+            sync.fetch("cases", case, case_number="1")
+            sync.fetch("cases", case, case_number="1")
+        base, delta = [call.args[0] for call in gus.parse.call_args_list]
+        self.assertEqual(base, "SELECT Id,SystemModstamp FROM Case WHERE (Status = 'New' OR Status = 'Open') "
+                               "AND CaseNumber = '1'")
+        self.assertEqual(delta, "SELECT Id,SystemModstamp FROM Case WHERE (Status = 'New' OR Status = 'Open') "
+                                "AND SystemModstamp > 2021-05-01T00:00:00Z AND CaseNumber = '1'")
+
+
+if __name__ == '__main__':
+    unittest.main()
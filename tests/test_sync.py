@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import unittest
+
+try:
+    import mock
+except ImportError:
+    from unittest import mock
+
+curr_path = os.path.abspath(os.path.dirname(__file__))
+package_path = os.path.join(curr_path, os.path.pardir)
+if package_path not in sys.path:
+    sys.path.insert(0, package_path)
+
+import pandas as pd
+
+from guspy import Case
+from guspy.sync import IncrementalSync
+
+
+def rows(*pairs):
+    return pd.DataFrame({"Id": [pair[0] for pair in pairs], "Status": [pair[1] for pair in pairs],
+                         "SystemModstamp": [pair[2] for pair in pairs]})
+
+
+class Syncs(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.gus = mock.Mock()
+        self.sync = IncrementalSync(self.gus, directory.name)
+        self.case = Case(fields="Id, Status")
+
+    def test_merges_changes_by_id(self):
+        self.gus.parse.side_effect = [
+            rows(("1", "New", "2021-05-01T00:00:00.000+0000"), ("2", "New", "2021-05-02T00:00:00.000+0000")),
+            rows(("2", "Closed", "2021-05-03T10:20:30.500+0000"), ("3", "New", "2021-05-03T00:00:00.000+0000"))]
+        self.sync.fetch("cases", self.case)
+        data = self.sync.fetch("cases", self.case)
+        self.assertEqual(dict(zip(data["Id"], data["Status"])), {"1": "New", "2": "Closed", "3": "New"})
+        self.assertEqual(len(data), 3)
+        self.assertEqual(list(self.sync.load("cases")["Id"]), list(data["Id"]))
+
+    def test_advances_watermark(self):
+        self.gus.parse.side_effect = [rows(("1", "New", "2021-05-01T00:00:00.000+0000")),
+                                      rows(("1", "Closed", "2021-05-03T10:20:30.500+0000")),
+                                      pd.DataFrame()]
+        for _ in range(3):
+            self.sync.fetch("cases", self.case)
+        self.assertEqual(self.sync.marks["cases"]["mark"], "2021-05-03T10:20:30Z")
+        queries = [call.args[0] for call in self.gus.parse.call_args_list]
+        self.assertTrue(queries[1].endswith("WHERE SystemModstamp > 2021-05-01T00:00:00Z"))
+        self.assertTrue(queries[2].endswith("WHERE SystemModstamp > 2021-05-03T10:20:30Z"))
+
+    def test_changed_query_resets(self):
+        self.gus.parse.side_effect = [rows(("1", "New", "2021-05-01T00:00:00.000+0000")),
+                                      rows(("2", "New", "2021-05-02T00:00:00.000+0000"))]
+        self.sync.fetch("cases", self.case)
+        data = self.sync.fetch("cases", self.case, case_number="2")
+        self.assertEqual(list(data["Id"]), ["2"])
+        self.assertNotIn("SystemModstamp >", self.gus.parse.call_args.args[0])
+
+    def test_missing_snapshot_pulls_full_result(self):
+        self.gus.parse.side_effect = [rows(("1", "New", "2021-05-01T00:00:00.000+0000")),
+                                      rows(("1", "New", "2021-05-01T00:00:00.000+0000"))]
+        self.sync.fetch("cases", self.case)
+        os.remove(self.sync.snapshot_path("cases"))
+        data = self.sync.fetch("cases", self.case)
+        self.assertEqual(list(data["Id"]), ["1"])
+        self.assertEqual(self.gus.parse.call_args.args[0], "SELECT Id,Status,SystemModstamp FROM Case")
+
+
+if __name__ == '__main__':
+    unittest.main()